@@ -0,0 +1,241 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: rotation is only coordinated between threads of one process
+    fcntl = None
+
+# Files next to the log that are not rotated segments
+NOT_SEGMENTS = ('.tmp', '.idx', '.lock')
+
+
+def rotated_segments(path):
+    """
+    Segments rotated out of the audit log at path, oldest first
+    Returns: [(segment name, file to read)]; the name drops '.gz', so it
+    stays the same when a segment is compressed
+    """
+    segments = {}
+    # Names sort by rotation time, and 'x' before 'x.gz' (see _rotate)
+    for segment in sorted(glob.glob(f"{glob.escape(path)}.*")):
+        if segment.endswith('.gz'):
+            # Complete once it exists; the plain file is removed right after
+            segments[os.path.basename(segment[:-3])] = segment
+        elif not segment.endswith(NOT_SEGMENTS):
+            segments[os.path.basename(segment)] = segment
+    return list(segments.items())
+
+
+def open_segment(path):
+    """Open a plain or gzip-compressed audit log file for binary reading"""
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+class AuditFileSink:
+    """
+    Appends audit events to a JSON-lines file through one open handle. Lines
+    reach the OS on every write; fsync runs at most every fsync_interval_s
+    (0 = on every write), so one sync commits every line written since the
+    last one. At max_size_mb the file is rotated into a timestamped segment
+    that is gzip-compressed in the background; only the newest max_segments
+    compressed segments are kept (0 = keep all).
+
+    Several processes may append to the same log. Each write holds an
+    exclusive lock on <log>.lock, reopens the log if another process rotated
+    it, and checks the size of the file itself, so no process keeps writing
+    to a segment that is about to be compressed and deleted.
+    """
+
+    def __init__(self, path, max_size_mb=10, fsync_interval_s=1.0, compress=True, max_segments=10):
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.fsync_interval_s = fsync_interval_s
+        self.compress = compress
+        self.max_segments = max_segments
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._lock_file = None
+        self._size = 0
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._closed = threading.Event()
+        self._syncer = None
+        self._compressors = []
+
+        self.written = 0
+        self.syncs = 0
+        self.rotations = 0
+
+    @classmethod
+    def from_settings(cls, path, settings):
+        """Build a sink from the audit config section"""
+        return cls(
+            path,
+            max_size_mb=settings.get('max_size_mb', 10),
+            fsync_interval_s=settings.get('fsync_interval_ms', 1000) / 1000,
+            compress=settings.get('compress', True),
+            max_segments=settings.get('max_segments', 10)
+        )
+
+    def _open(self):
+        # Opened on first write, so read-only users of the logger never touch the file
+        self._file = open(self.path, 'ab')
+        self._size = os.fstat(self._file.fileno()).st_size
+        if fcntl is not None and self._lock_file is None:
+            self._lock_file = open(f"{self.path}.lock", 'a')
+        self._closed.clear()
+        if self.fsync_interval_s and self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_loop, name='audit-file-sync', daemon=True)
+            self._syncer.start()
+        # Segments left uncompressed by an earlier run that exited mid-rotation
+        for segment in self._segments(compressed=False):
+            self._compress_in_background(segment)
+
+    def write(self, entries):
+        """Append events as JSON lines"""
+        data = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries).encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._lock_log()
+            try:
+                self._follow_rotation()
+                self._file.write(data)
+                self._file.flush()
+                # Other processes append too, so the size comes from the file
+                self._size = os.fstat(self._file.fileno()).st_size
+                self._dirty = True
+                self.written += len(entries)
+
+                if not self.fsync_interval_s:
+                    self._sync()
+                if self.max_bytes and self._size >= self.max_bytes:
+                    self._rotate()
+            finally:
+                self._unlock_log()
+
+    def _lock_log(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_log(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _follow_rotation(self):
+        """Reopen the log if another process rotated it away from under our handle"""
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self._file.fileno()).st_ino:
+            self._sync()
+            self._file.close()
+            self._file = open(self.path, 'ab')
+
+    def _sync(self):
+        if self._dirty and self._file is not None:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self.syncs += 1
+        self._last_sync = time.monotonic()
+
+    def _sync_loop(self):
+        while not self._closed.wait(self.fsync_interval_s):
+            with self._lock:
+                if time.monotonic() - self._last_sync >= self.fsync_interval_s:
+                    self._sync()
+
+    def _rotate(self):
+        """Close the full file, move it to a segment and start a new one"""
+        self._sync()
+        self._file.close()
+        # Fixed-width timestamps keep segment names in rotation order
+        segment = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        while os.path.exists(segment) or os.path.exists(f"{segment}.gz"):
+            time.sleep(0.000001)
+            segment = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, segment)
+        self._file = open(self.path, 'ab')
+        self._size = 0
+        self.rotations += 1
+        print(f"[AUDIT_LOGGER] 🔄 Rotated audit log to {os.path.basename(segment)}", file=sys.stderr)
+        if self.compress:
+            self._compress_in_background(segment)
+        else:
+            self._prune()
+
+    def _segments(self, compressed):
+        # Segment names sort by rotation time (see _rotate)
+        segments = sorted(glob.glob(f"{glob.escape(self.path)}.*"))
+        if compressed:
+            return [s for s in segments if s.endswith('.gz')]
+        return [s for s in segments if not s.endswith(('.gz',) + NOT_SEGMENTS)]
+
+    def _compress_in_background(self, segment):
+        self._compressors = [t for t in self._compressors if t.is_alive()]
+        thread = threading.Thread(target=self._compress_segment, args=(segment,), name='audit-compress', daemon=True)
+        self._compressors.append(thread)
+        thread.start()
+
+    def _compress_segment(self, segment):
+        tmp_path = f"{segment}.gz.{os.getpid()}.tmp"
+        try:
+            with open(segment, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, f"{segment}.gz")
+            os.remove(segment)
+        except FileNotFoundError:
+            # Another process starting up compressed the same leftover segment
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        except OSError as e:
+            print(f"[AUDIT_LOGGER] ❌ Failed to compress {segment}: {e}", file=sys.stderr)
+            return
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        """Delete the oldest segments beyond max_segments"""
+        if not self.max_segments:
+            return
+        segments = self._segments(compressed=self.compress)
+        for segment in segments[:-self.max_segments]:
+            try:
+                os.remove(segment)
+            except OSError:
+                pass
+
+    def close(self):
+        """Sync and close the file and wait for pending compressions"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            self._closed.set()
+        for thread in self._compressors:
+            thread.join()
+        self._syncer = None
+
+    def stats(self):
+        return {
+            'size_bytes': self._size,
+            'written': self.written,
+            'syncs': self.syncs,
+            'rotations': self.rotations,
+        }
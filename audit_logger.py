@@ -1,26 +1,41 @@
-import json
+import atexit
 from datetime import datetime
 import os
 import sys
+import threading
+from bson.objectid import ObjectId
 from mongo_handler import MongoDBHandler
+from audit_writer import AuditWriter
+from audit_file_sink import AuditFileSink
+from audit_tail import AuditTail
+from audit_spool import AuditSpool
+from circuit_breaker import CircuitBreaker
 
 
 class AuditLogger:
     """Logs all command interceptions and security events to MongoDB"""
 
-    def __init__(self, use_mongodb=True):
+    def __init__(self, use_mongodb=True, settings=None):
         print("[DEBUG] Initializing AuditLogger with use_mongodb =", use_mongodb, file=sys.stderr)
         self.use_mongodb = use_mongodb
         self.mongo_handler = None  # Initialize to None
 
+        settings = settings or {}
+
         # File logging fallback setup
-        log_file = 'audit.log'
+        log_file = settings.get('log_file', 'audit.log')
         if not os.path.isabs(log_file):
             log_file = os.path.join(
                 os.path.dirname(os.path.abspath(__file__)),
                 log_file
             )
         self.log_file = log_file  # Always set this
+        # One open handle with periodic fsync, rotated at max_size_mb
+        self.file_sink = AuditFileSink.from_settings(log_file, settings)
+        self.tail = AuditTail(log_file)
+        spool_settings = settings.get('spool') or {}
+        # Without a URI no MongoDB handler can ever be built, so there is nothing to spool for
+        spool_enabled = use_mongodb and spool_settings.get('enabled', False) and bool(os.getenv('MONGODB_URI'))
 
         if self.use_mongodb:
             try:
@@ -30,14 +45,47 @@ class AuditLogger:
                 print("[AUDIT_LOGGER] ✅ Successfully initialized MongoDB logging", file=sys.stderr)
                 self.use_mongodb = True
             except Exception as e:
-                print(f"[AUDIT_LOGGER] ❌ MongoDB initialization failed, falling back to file: {e}", file=sys.stderr)
-                import traceback
-                traceback.print_exc(file=sys.stderr)
-                self.use_mongodb = False
+                if spool_enabled:
+                    # Spool everything and keep trying to connect in the background
+                    print(f"[AUDIT_LOGGER] ❌ MongoDB initialization failed, spooling events until it is reachable: {e}", file=sys.stderr)
+                else:
+                    print(f"[AUDIT_LOGGER] ❌ MongoDB initialization failed, falling back to file: {e}", file=sys.stderr)
+                    import traceback
+                    traceback.print_exc(file=sys.stderr)
+                    self.use_mongodb = False
                 self.mongo_handler = None
         else:
             print("[AUDIT_LOGGER] MongoDB logging disabled, using file fallback only", file=sys.stderr)
 
+        # Circuit breaker in front of MongoDB, with a local spool that a
+        # background drainer bulk-loads once MongoDB is reachable again
+        self.breaker = None
+        self.spool = None
+        if spool_enabled:
+            self.breaker = CircuitBreaker(
+                'MongoDB',
+                failure_threshold=spool_settings.get('failure_threshold', 3),
+                reset_timeout_s=spool_settings.get('reset_timeout_s', 30)
+            )
+            if self.mongo_handler is None:
+                self.breaker.trip()
+            spool_file = spool_settings.get('path', 'audit.spool')
+            if not os.path.isabs(spool_file):
+                spool_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), spool_file)
+            self.spool = AuditSpool(spool_file)
+            self._drain_interval = spool_settings.get('drain_interval_s', 5)
+            self._drain_batch_size = spool_settings.get('drain_batch_size', 500)
+            self._drain_stop = threading.Event()
+            self._drainer = threading.Thread(target=self._drain_loop, name='audit-spool-drainer', daemon=True)
+            self._drainer.start()
+
+        # With a writer, events are queued and written in batches by a background
+        # thread; without one, log_event writes before it returns
+        self.writer = AuditWriter.from_settings(self._write_batch, settings.get('writer'))
+        if self.writer is not None:
+            print(f"[AUDIT_LOGGER] Batched background writes enabled (policy: {self.writer.on_full})", file=sys.stderr)
+        atexit.register(self.close)
+
     def log_event(self, command, secrets_detected, action, user_choice=None, latency_ms=None):
         """Log a command execution event"""
         timestamp = datetime.now().isoformat()
@@ -50,45 +98,134 @@ class AuditLogger:
             'secret_severities': [s.get('severity', 'unknown') for s in secrets_detected],
             'user_choice': user_choice,
             'latency_ms': latency_ms,
-            'mark_detection': None  # For user feedback: 'true_positive', 'false_positive', etc.
+            'mark_detection': None  # Set to "true" / "false" (a true / false positive) from the dashboard
         }
 
+        if self.writer is not None:
+            if not self.writer.submit(log_entry):
+                print(f"[AUDIT_LOGGER] ⚠️ Audit queue full, dropped event: {action}", file=sys.stderr)
+            return log_entry
+
+        self._write_batch([log_entry])
+        return log_entry
+
+    def _write_batch(self, entries):
+        """Write events to MongoDB in one round-trip, falling back to the file"""
+        if self.spool is not None:
+            return self._write_or_spool(entries)
+
         logged = False
 
         if self.use_mongodb and self.mongo_handler:
             try:
-                print(f"[AUDIT_LOGGER] 📤 Attempting MongoDB insert for action: {action}", file=sys.stderr, flush=True)
-                result = self.mongo_handler.insert_log(log_entry)
-                if result is not None:
-                    print(f"[AUDIT_LOGGER] ✅ MongoDB logged successfully: {action} - {command[:50]}...", file=sys.stderr, flush=True)
+                inserted = self.mongo_handler.insert_logs(entries)
+                if inserted is not None:
+                    print(f"[AUDIT_LOGGER] ✅ MongoDB logged {len(entries)} events", file=sys.stderr)
                     logged = True
                 else:
-                    print(f"[AUDIT_LOGGER] ⚠️ MongoDB insert returned None, falling back to file", file=sys.stderr, flush=True)
+                    print(f"[AUDIT_LOGGER] ⚠️ MongoDB insert returned nothing, falling back to file", file=sys.stderr)
             except Exception as e:
-                print(f"[AUDIT_LOGGER] ❌ MongoDB write failed: {e}", file=sys.stderr, flush=True)
+                print(f"[AUDIT_LOGGER] ❌ MongoDB write failed: {e}", file=sys.stderr)
                 import traceback
                 traceback.print_exc(file=sys.stderr)
         else:
             if self.use_mongodb:
-                print(f"[AUDIT_LOGGER] ⚠️ MongoDB handler not available, using file", file=sys.stderr, flush=True)
+                print(f"[AUDIT_LOGGER] ⚠️ MongoDB handler not available, using file", file=sys.stderr)
 
         # Fallback to file if MongoDB disabled or failed
         if not logged:
             try:
-                with open(self.log_file, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps(log_entry) + '\n')
-                    f.flush()
-                print(f"[AUDIT_LOGGER] 📝 File logged: {action} - {command[:50]}...", file=sys.stderr, flush=True)
+                self.file_sink.write(entries)
+                print(f"[AUDIT_LOGGER] 📝 File logged {len(entries)} events", file=sys.stderr)
                 logged = True
             except Exception as e:
-                print(f"[AUDIT_LOGGER] ❌ File write failed: {e}", file=sys.stderr, flush=True)
+                print(f"[AUDIT_LOGGER] ❌ File write failed: {e}", file=sys.stderr)
                 import traceback
                 traceback.print_exc(file=sys.stderr)
 
         if not logged:
-            print(f"[AUDIT_LOGGER] 🚨 CRITICAL: Failed to log event anywhere!", file=sys.stderr, flush=True)
+            print(f"[AUDIT_LOGGER] 🚨 CRITICAL: Failed to log {len(entries)} events anywhere!", file=sys.stderr, flush=True)
 
-        return log_entry
+        return logged
+
+    def _write_or_spool(self, entries):
+        """Write to MongoDB while the circuit is closed, otherwise straight to the spool"""
+        for entry in entries:
+            # Ids assigned here make every later retry of these events idempotent
+            entry.setdefault('_id', ObjectId())
+
+        if self.mongo_handler is not None and self.breaker.allow():
+            try:
+                self.mongo_handler.insert_logs(entries)
+                self.breaker.record_success()
+                return True
+            except Exception as e:
+                self.breaker.record_failure()
+                print(f"[AUDIT_LOGGER] ❌ MongoDB write failed, spooling {len(entries)} events: {e}", file=sys.stderr)
+
+        try:
+            self.spool.append(entries)
+        except Exception as e:
+            print(f"[AUDIT_LOGGER] 🚨 CRITICAL: Failed to spool {len(entries)} events: {e}", file=sys.stderr, flush=True)
+            return False
+
+        # Reads fall back to the file while MongoDB is away, so spooled events go there too
+        try:
+            self.file_sink.write(entries)
+        except Exception as e:
+            print(f"[AUDIT_LOGGER] ⚠️ File write of spooled events failed: {e}", file=sys.stderr)
+        return True
+
+    def _drain_loop(self):
+        while not self._drain_stop.wait(self._drain_interval):
+            self.drain_spool()
+
+    def drain_spool(self):
+        """Bulk-load spooled events into MongoDB if the circuit lets a call through"""
+        if self.mongo_handler is not None and not self.spool.pending_bytes():
+            return 0
+        if not self.breaker.allow():
+            return 0
+        try:
+            if self.mongo_handler is None:
+                self.mongo_handler = MongoDBHandler()
+            drained = self.spool.drain(self._insert_spooled, self._drain_batch_size)
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"[AUDIT_LOGGER] ⚠️ Spool drain stopped: {e}", file=sys.stderr)
+            return 0
+        self.breaker.record_success()
+        if drained:
+            print(f"[AUDIT_LOGGER] ✅ Drained {drained} spooled events into MongoDB", file=sys.stderr)
+        return drained
+
+    def _insert_spooled(self, entries):
+        for entry in entries:
+            entry['_id'] = ObjectId(entry['_id'])
+        self.mongo_handler.insert_logs(entries)
+
+    def flush(self, timeout=None):
+        """Wait for queued events to be written"""
+        return self.writer.flush(timeout) if self.writer is not None else True
+
+    def close(self):
+        """Write out queued events, stop the background writer and sync the log file"""
+        if self.writer is not None:
+            self.writer.close()
+        # Whatever is still spooled is drained after the next start
+        if self.spool is not None:
+            self._drain_stop.set()
+        self.file_sink.close()
+
+    def get_writer_stats(self):
+        """Queue depth and throughput of the background writer"""
+        return self.writer.stats() if self.writer is not None else {'enabled': False}
+
+    def get_spool_stats(self):
+        """Circuit breaker state and spool backlog"""
+        if self.spool is None:
+            return {'enabled': False}
+        return dict(self.spool.stats(), circuit=self.breaker.stats())
 
     def update_mark_detection(self, log_id, mark):
         if self.use_mongodb and self.mongo_handler:
@@ -99,27 +236,38 @@ class AuditLogger:
                 return False
         return False
 
-    def get_recent_logs(self, count=10):
-        """Retrieve recent log entries"""
+    def get_recent_logs(self, count=10, projection=None, action=None):
+        """
+        Retrieve recent log entries
+        projection: optional list of fields to return; action: only entries with this action
+        """
         if self.use_mongodb and self.mongo_handler:
             try:
-                return self.mongo_handler.get_recent_logs(count)
+                return self.mongo_handler.get_recent_logs(count, projection, action)
             except Exception as e:
                 print(f"[AUDIT_LOGGER ERROR] Failed to read from MongoDB: {e}", file=sys.stderr)
-        # Fallback to file reading
-        if not os.path.exists(self.log_file):
+        # Fallback to file reading, seeking back from the end of the file
+        try:
+            if action:
+                # The file has no index to filter on; read a wider window, as the dashboard did
+                logs = [log for log in self.tail.last(max(count, 1000)) if log.get('action') == action][-count:]
+            else:
+                logs = self.tail.last(count)
+            if projection:
+                fields = set(projection) | {'_id'}
+                logs = [{key: value for key, value in log.items() if key in fields} for log in logs]
+            return logs
+        except Exception as e:
+            print(f"[AUDIT_LOGGER ERROR] Failed to read log: {e}", file=sys.stderr)
             return []
 
-        entries = []
+    def get_logs_since(self, cursor=None, limit=1000):
+        """
+        Read file log entries after cursor (an opaque string from the previous call; None to start)
+        Returns: (entries, cursor for the next call)
+        """
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            for line in lines[-count:]:
-                try:
-                    entries.append(json.loads(line.strip()))
-                except Exception:
-                    continue
+            return self.tail.since(cursor, limit)
         except Exception as e:
             print(f"[AUDIT_LOGGER ERROR] Failed to read log: {e}", file=sys.stderr)
-
-        return entries
+            return [], cursor
@@ -0,0 +1,189 @@
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the spool is only safe to share between threads of one process
+    fcntl = None
+
+
+class AuditSpool:
+    """
+    Append-only local spool of audit events waiting for MongoDB. Appends are
+    fsynced before they return. drain() hands the oldest events to an insert
+    function and only then advances the committed offset (kept in a sidecar
+    file), so a crash mid-drain replays events rather than losing them; the
+    events carry their own ids, which makes the replay idempotent.
+
+    Several processes (the middleware, interceptor shells) can share one
+    spool: appends, offset updates and the truncate after a full drain run
+    under an exclusive file lock and always re-read the offset from disk,
+    and only one process drains at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.lock_path = f"{path}.lock"
+        self.drain_lock_path = f"{path}.drain.lock"
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self.offset = 0
+        self.spooled = 0
+        self.drained = 0
+        self.corrupt = 0
+        with self._locked():
+            self._recover()
+
+    @contextmanager
+    def _locked(self, drain=False):
+        """
+        Hold the spool lock (or with drain, the drain lock without waiting for
+        it): a thread lock plus an exclusive lock on a lock file
+        Yields: whether the lock was taken (always, unless drain is set)
+        """
+        thread_lock = self._drain_lock if drain else self._lock
+        blocking = not drain
+        if not thread_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            with open(self.drain_lock_path if drain else self.lock_path, 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+                yield True
+        finally:
+            thread_lock.release()
+
+    def _size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _recover(self):
+        """Drop a partial last line left by a crash and sanity-check the offset"""
+        size = self._size()
+        if size:
+            with open(self.path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    # Never acknowledged, since appends fsync whole lines
+                    end = size
+                    while end > 0:
+                        start = max(0, end - 65536)
+                        f.seek(start)
+                        newline = f.read(end - start).rfind(b'\n')
+                        if newline != -1:
+                            end = start + newline + 1
+                            break
+                        end = start
+                    f.truncate(end)
+                    size = end
+                    print(f"[SPOOL] Dropped a partial record at the end of {self.path}", file=sys.stderr)
+        if self._read_offset() > size:
+            # An offset past the end can't be trusted: replay from the start, inserts are idempotent
+            self._write_offset(0)
+
+    def _read_offset(self):
+        """Read the committed offset; another process may have moved it, so never trust a cached one"""
+        try:
+            with open(self.offset_path, 'r', encoding='utf-8') as f:
+                self.offset = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self.offset = 0
+        return self.offset
+
+    def _write_offset(self, offset):
+        tmp_path = f"{self.offset_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+        self.offset = offset
+
+    def append(self, entries):
+        """Durably append events"""
+        data = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries).encode('utf-8')
+        with self._locked():
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.spooled += len(entries)
+
+    def pending_bytes(self):
+        with self._locked():
+            return self._size() - self._read_offset()
+
+    def drain(self, insert_batch, batch_size=500):
+        """
+        Hand spooled events to insert_batch in batches, oldest first, until the
+        spool is empty. insert_batch raising stops the drain; the failed batch
+        stays in the spool. Returns: number of events drained (0 while another
+        process is draining)
+        """
+        drained = 0
+        # Held across the inserts, so processes don't load the same batch twice;
+        # appends only need the spool lock and keep going meanwhile
+        with self._locked(drain=True) as draining:
+            if not draining:
+                return 0
+            while True:
+                with self._locked():
+                    if not os.path.exists(self.path):
+                        return drained
+                    offset = self._read_offset()
+                    with open(self.path, 'rb') as f:
+                        f.seek(offset)
+                        lines = []
+                        end = offset
+                        for line in f:
+                            lines.append(line)
+                            end += len(line)
+                            if len(lines) >= batch_size:
+                                break
+                    if not lines:
+                        if offset > self._size():
+                            # An offset past the end can't be trusted: replay
+                            # from the start rather than guess what was drained
+                            self._write_offset(0)
+                            continue
+                        if offset:
+                            # Fully drained: start the spool over. Appends hold the same
+                            # lock, so nothing lands between this check and the truncate;
+                            # the offset goes first, so a crash in between only replays
+                            self._write_offset(0)
+                            with open(self.path, 'wb'):
+                                pass
+                        return drained
+
+                entries = []
+                for line in lines:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        self.corrupt += 1
+                if entries:
+                    insert_batch(entries)
+
+                with self._locked():
+                    self._write_offset(end)
+                drained += len(entries)
+                self.drained += len(entries)
+
+    def stats(self):
+        return {
+            'pending_bytes': self.pending_bytes(),
+            'spooled': self.spooled,
+            'drained': self.drained,
+            'corrupt': self.corrupt,
+        }
@@ -0,0 +1,225 @@
+import json
+import os
+import struct
+import sys
+import threading
+from collections import deque
+from audit_file_sink import open_segment, rotated_segments
+
+INDEX_MAGIC = b'TGIDX001'
+INDEX_HEADER = struct.Struct('<8sQI')  # magic, inode of the indexed log file, stride
+INDEX_ENTRY = struct.Struct('<Q')      # byte offset of line i * stride
+BLOCK_SIZE = 65536
+
+
+def tail_lines(f, count, block_size=BLOCK_SIZE):
+    """Return the last count complete lines of a binary file, reading backwards from the end"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if count <= 0 or end == 0:
+        return []
+    chunks = []
+    newlines = 0
+    position = end
+    # One extra newline marks the start of the oldest wanted line
+    while position > 0 and newlines <= count:
+        step = min(block_size, position)
+        position -= step
+        f.seek(position)
+        chunk = f.read(step)
+        chunks.append(chunk)
+        newlines += chunk.count(b'\n')
+    lines = b''.join(reversed(chunks)).split(b'\n')
+    # What follows the last newline is empty or a line still being written
+    lines.pop()
+    if position > 0:
+        # The first piece is the tail of a line that started before the data read
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def segment_tail(path, count):
+    """Last count lines of a rotated segment; a compressed one can't seek from the end, so it is read through"""
+    try:
+        f = open_segment(path)
+    except FileNotFoundError:
+        # Compressed since it was listed
+        f = open_segment(f"{path}.gz")
+    with f:
+        if f.name.endswith('.gz'):
+            return list(deque(f, maxlen=count))
+        return tail_lines(f, count)
+
+
+def parse_lines(lines):
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+class AuditTail:
+    """
+    Reads the end of a JSON-lines audit log without reading the whole file.
+    last() seeks backwards from the end. since() resumes from an opaque
+    "<inode>:<line>" cursor using a sidecar index (<log>.idx) of the byte
+    offset of every stride-th line; the index is brought up to date from its
+    last entry on each call, so keeping it current costs only the bytes
+    appended since, and it is rebuilt when the log is rotated.
+    """
+
+    def __init__(self, path, stride=1024):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.stride = stride
+        self._lock = threading.Lock()
+        self._offsets = None   # byte offset of line i * stride
+        self._inode = None
+        self._lines = 0        # lines covered by the index scan so far
+        self._scanned_to = 0   # byte offset the index scan reached
+
+    def last(self, count):
+        """
+        Return the last count events, oldest first. Right after a rotation the
+        log holds only a few lines, so the rest come from the newest segments.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                lines = tail_lines(f, count)
+        except FileNotFoundError:
+            lines = []
+        for _, segment in reversed(rotated_segments(self.path)):
+            if len(lines) >= count:
+                break
+            try:
+                lines = segment_tail(segment, count - len(lines)) + lines
+            except FileNotFoundError:
+                # Pruned since it was listed
+                break
+        return parse_lines(lines)
+
+    def since(self, cursor=None, limit=1000):
+        """
+        Return up to limit events after cursor (None or '' for the start of the log)
+        Returns: (events, cursor to pass next time)
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return [], None
+        with f:
+            with self._lock:
+                self._refresh(f)
+                inode, line = self._parse_cursor(cursor)
+                if inode != self._inode or line > self._lines:
+                    # A cursor into a rotated or truncated log restarts at this file's first line
+                    line = 0
+                f.seek(self._offsets[line // self.stride] if self._offsets else 0)
+            for _ in range(line % self.stride):
+                f.readline()
+            lines = []
+            while len(lines) < limit:
+                raw = f.readline()
+                if not raw.endswith(b'\n'):
+                    break
+                lines.append(raw)
+            return parse_lines(lines), f"{self._inode}:{line + len(lines)}"
+
+    @staticmethod
+    def _parse_cursor(cursor):
+        """Split an "<inode>:<line>" cursor; anything else means the start of the log"""
+        try:
+            inode, line = str(cursor).split(':')
+            return int(inode), max(0, int(line))
+        except (TypeError, ValueError):
+            return None, 0
+
+    def count(self):
+        """Number of complete lines in the log"""
+        try:
+            with open(self.path, 'rb') as f, self._lock:
+                self._refresh(f)
+                return self._lines
+        except FileNotFoundError:
+            return 0
+
+    def _refresh(self, f):
+        """Extend the index to the current end of the log"""
+        st = os.fstat(f.fileno())
+        if self._offsets is None:
+            self._load(st.st_ino)
+        if st.st_ino != self._inode or st.st_size < self._scanned_to:
+            # Rotated or truncated: index the new file from the start
+            self._reset(st.st_ino)
+        if st.st_size == self._scanned_to:
+            return
+
+        f.seek(self._scanned_to)
+        position = self._scanned_to
+        new_offsets = []
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            newlines = block.count(b'\n')
+            if newlines:
+                if self._lines % self.stride + newlines < self.stride:
+                    # No index entry falls inside this block
+                    self._lines += newlines
+                else:
+                    start = 0
+                    for _ in range(newlines):
+                        start = block.index(b'\n', start) + 1
+                        self._lines += 1
+                        if self._lines % self.stride == 0:
+                            new_offsets.append(position + start)
+                # Stop at the last complete line; a partial one is picked up next time
+                self._scanned_to = position + block.rindex(b'\n') + 1
+            position += len(block)
+        if new_offsets:
+            self._offsets.extend(new_offsets)
+            self._write_index()
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offsets = [0]
+        self._lines = 0
+        self._scanned_to = 0
+        self._write_index()
+
+    def _load(self, inode):
+        """Load the sidecar index; the scan resumes from its last entry"""
+        try:
+            with open(self.index_path, 'rb') as idx:
+                data = idx.read()
+        except OSError:
+            return self._reset(inode)
+        if len(data) < INDEX_HEADER.size + INDEX_ENTRY.size:
+            return self._reset(inode)
+        magic, indexed_inode, stride = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or indexed_inode != inode or stride != self.stride:
+            return self._reset(inode)
+        body = data[INDEX_HEADER.size:]
+        body = body[:len(body) - len(body) % INDEX_ENTRY.size]
+        self._inode = inode
+        self._offsets = [value for (value,) in INDEX_ENTRY.iter_unpack(body)]
+        self._lines = (len(self._offsets) - 1) * self.stride
+        self._scanned_to = self._offsets[-1]
+
+    def _write_index(self):
+        """
+        Replace the index as a whole. Every reader of the same log derives the
+        same offsets, so processes racing here write identical content, where
+        appending would have duplicated entries.
+        """
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as idx:
+                idx.write(INDEX_HEADER.pack(INDEX_MAGIC, self._inode, self.stride))
+                idx.write(b''.join(INDEX_ENTRY.pack(offset) for offset in self._offsets))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"[AUDIT_TAIL] Could not write index {self.index_path}: {e}", file=sys.stderr)
@@ -0,0 +1,159 @@
+import sys
+import threading
+import time
+from collections import deque
+
+POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+
+class AuditWriter:
+    """
+    Writes audit events from a background thread. Events wait in a bounded
+    queue and are handed to write_batch in groups of up to batch_size, at
+    least every flush_interval seconds (write_batch returns False or raises
+    when a batch is lost). When the queue is full, on_full
+    decides: block the caller for up to block_timeout_s (then drop the event),
+    drop the new event, or drop the oldest queued one.
+    """
+
+    def __init__(self, write_batch, max_queue=10000, batch_size=100, flush_interval=0.5,
+                 on_full='block', block_timeout_s=0.1):
+        if on_full not in POLICIES:
+            raise ValueError(f"Unknown audit queue policy '{on_full}' (expected one of {', '.join(POLICIES)})")
+        self.write_batch = write_batch
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_full = on_full
+        self.block_timeout_s = block_timeout_s
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._flushing = 0
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_depth = 0
+        self.last_batch_ms = None
+
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_settings(cls, write_batch, settings):
+        """Build a writer from the audit.writer config section (None if disabled)"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(
+            write_batch,
+            max_queue=settings.get('max_queue', 10000),
+            batch_size=settings.get('batch_size', 100),
+            flush_interval=settings.get('flush_interval_ms', 500) / 1000,
+            on_full=settings.get('on_full', 'block'),
+            block_timeout_s=settings.get('block_timeout_ms', 100) / 1000
+        )
+
+    def submit(self, event):
+        """Queue an event; returns False if it was dropped"""
+        with self._lock:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.on_full == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.on_full == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                else:
+                    self.blocked += 1
+                    if not self._not_full.wait_for(lambda: len(self._queue) < self.max_queue or self._closed,
+                                                   timeout=self.block_timeout_s) or self._closed:
+                        self.dropped += 1
+                        return False
+            self._queue.append(event)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            if len(self._queue) >= self.batch_size:
+                self._not_empty.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Wait for a full batch, the flush interval, a flush() or shutdown
+                self._not_empty.wait_for(
+                    lambda: len(self._queue) >= self.batch_size or (self._flushing and self._queue) or self._closed,
+                    timeout=self.flush_interval
+                )
+                if not self._queue:
+                    if self._closed:
+                        return
+                    continue
+                count = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(count)]
+                self._in_flight = count
+                self._not_full.notify_all()
+            self._write(batch)
+            with self._lock:
+                self._in_flight = 0
+                self._not_empty.notify_all()
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            if self.write_batch(batch) is False:
+                self.failed_batches += 1
+            else:
+                self.written += len(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"[AUDIT_WRITER] ❌ Failed to write {len(batch)} events: {e}", file=sys.stderr)
+        self.batches += 1
+        self.last_batch_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def flush(self, timeout=None):
+        """Wait until every queued event has been handed to write_batch"""
+        with self._lock:
+            self._flushing += 1
+            self._not_empty.notify_all()
+            try:
+                return self._not_empty.wait_for(lambda: not self._queue and not self._in_flight, timeout=timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=5.0):
+        """Flush what is queued and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+        if self._queue:
+            print(f"[AUDIT_WRITER] ⚠️ {len(self._queue)} events not written at shutdown", file=sys.stderr)
+
+    def stats(self):
+        """Queue depth and throughput counters"""
+        return {
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'capacity': self.max_queue,
+            'policy': self.on_full,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'last_batch_ms': self.last_batch_ms,
+        }
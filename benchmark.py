@@ -4,7 +4,13 @@ TerminalGuard Benchmark Suite
 Runs comprehensive tests and generates performance/accuracy metrics
 """
 
+import argparse
 import json
+import math
+import random
+import re
+import string
+import subprocess
 import time
 import sys
 import os
@@ -17,6 +23,12 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from secret_detector import SecretDetector
 from config_manager import ConfigManager
+from regex_backend import BACKENDS, get_backend, compile_pattern
+from scan_engine import ScanEngine
+from token_validators import valid_matches
+from entropy_engine import EntropyEngine
+from config_snapshot import snapshot_path
+from audit_file_sink import open_segment, rotated_segments
 
 
 class BenchmarkTestCase:
@@ -109,6 +121,15 @@ def create_test_database() -> List[BenchmarkTestCase]:
         BenchmarkTestCase('<password>xmlsecretpass</password>', True, "xml_credentials", "high", "Config"),
     ])
 
+    # Tool arguments as the MCP middleware scans them (json.dumps output), where
+    # a newline or tab before a key is a backslash escape, not a word boundary
+    tests.extend([
+        BenchmarkTestCase(json.dumps({'body': 'hi\nAKIAIOSFODNN7EXAMPLE'}), True, "aws_access_key", "critical", "JSON Escaped"),
+        BenchmarkTestCase(json.dumps({'body': 'key:\tAKIAIOSFODNN7EXAMPLE'}), True, "aws_access_key", "critical", "JSON Escaped"),
+        BenchmarkTestCase(json.dumps({'body': 'x\b0123456789abcdef0123456789abcdef'}), True, "algolia_api_key", "high", "JSON Escaped"),
+        BenchmarkTestCase(json.dumps({'body': 'caf\u00e90123456789abcdef0123456789abcdef'}), True, "algolia_api_key", "high", "JSON Escaped"),
+    ])
+
     # ===== TRUE NEGATIVES (Should NOT be detected) =====
 
     # Safe commands
@@ -194,8 +215,8 @@ class TerminalGuardBenchmark:
         latency_ms = (time.perf_counter() - start_time) * 1000
 
         was_detected = len(detected_secrets) > 0
-        detected_types = [s['type'] for s in detected_secrets]
-        detected_severities = [s.get('severity', 'unknown') for s in detected_secrets]
+        detected_types = detected_secrets.types
+        detected_severities = detected_secrets.severities
 
         # Determine result type
         if test.has_secret and was_detected:
@@ -391,8 +412,421 @@ class TerminalGuardBenchmark:
         print("="*80)
 
 
+# ===== PER-PATTERN PROFILING =====
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def create_adversarial_inputs(size: int, seed: int = 7) -> Dict[str, str]:
+    """Build inputs of roughly `size` characters aimed at backtracking-prone patterns"""
+    rng = random.Random(seed)
+
+    def fill(make_chunk, prefix=''):
+        parts = [prefix]
+        length = len(prefix)
+        while length < size:
+            chunk = make_chunk()
+            parts.append(chunk)
+            length += len(chunk)
+        return ''.join(parts)[:size]
+
+    return {
+        # Long runs of lowercase words, aimed at the seed phrase rule
+        'word_run': fill(lambda: ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) + ' ',
+                         prefix='seed = '),
+        # One long base58 string, aimed at the bitcoin address rule
+        'base58_run': fill(lambda: rng.choice(BASE58_ALPHABET), prefix='1'),
+        # URLs with credentials-like shape but no '@' to end them
+        'url_no_at': fill(lambda: f"https://user{rng.randint(0, 99)}:{''.join(rng.choices(string.ascii_letters, k=12))}/"),
+        # Key/value lines whose values never reach the minimum length
+        'short_assignments': fill(lambda: f"password={rng.choice(string.ascii_lowercase)} token: {rng.randint(0, 9)}; "),
+    }
+
+
+def load_audit_commands(limit: int = 1000) -> List[str]:
+    """Replay commands stored in the local audit.log and its rotated segments (oldest first) as realistic inputs"""
+    log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audit.log')
+    commands = []
+    files = [segment for _, segment in rotated_segments(log_file)]
+    if os.path.exists(log_file):
+        files.append(log_file)
+    for path in files:
+        try:
+            f = open_segment(path)
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    command = json.loads(line).get('command')
+                except Exception:
+                    continue
+                if command:
+                    commands.append(command)
+                if len(commands) >= limit:
+                    return commands
+    return commands
+
+
+class PatternProfiler:
+    """Times each detection pattern on its own, bypassing the prefilter and whitelist"""
+
+    def __init__(self, backend: str = None, repeats: int = 3, max_seconds: float = 1.0):
+        self.config = ConfigManager()
+        self.patterns = self.config.get_patterns()
+        if backend:
+            # Recompile with an explicit engine, e.g. to compare re against re2
+            engine = get_backend(backend)
+            for info in self.patterns.values():
+                info['regex'], info['engine'] = compile_pattern(info['regex'].pattern, engine)
+        self.repeats = repeats
+        self.max_seconds = max_seconds  # stop growing a curve once a single run gets this slow
+
+    def _time_pattern(self, regex, texts: List[str]) -> float:
+        """Best-of-N time in ms to run one pattern over all texts"""
+        best = None
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            for text in texts:
+                for _ in regex.finditer(text):
+                    pass
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            if elapsed > self.max_seconds:
+                break
+        return best * 1000
+
+    def profile_corpus(self, texts: List[str]) -> List[Dict]:
+        """Rank patterns by their total cost over a realistic corpus"""
+        rows = []
+        for name, info in self.patterns.items():
+            rows.append({
+                'pattern': name,
+                'severity': info['severity'],
+                'engine': info.get('engine', 're'),
+                'corpus_ms': round(self._time_pattern(info['regex'], texts), 4)
+            })
+        rows.sort(key=lambda r: r['corpus_ms'], reverse=True)
+        return rows
+
+    def growth_curves(self, sizes: List[int]) -> Dict[str, Dict]:
+        """Time every pattern on each adversarial input family at increasing sizes"""
+        inputs = {size: create_adversarial_inputs(size) for size in sizes}
+        curves = {}
+        for name, info in self.patterns.items():
+            worst = {}
+            families = {}
+            stopped = set()
+            for size in sizes:
+                for family, text in inputs[size].items():
+                    if family in stopped:
+                        continue
+                    ms = self._time_pattern(info['regex'], [text])
+                    families.setdefault(family, {})[size] = round(ms, 4)
+                    if ms / 1000 > self.max_seconds:
+                        stopped.add(family)
+                    if ms >= worst.get(size, (0, None))[0]:
+                        worst[size] = (ms, family)
+
+            curves[name] = {
+                'worst_ms': {size: round(ms, 4) for size, (ms, _) in worst.items()},
+                'worst_family': worst[max(worst)][1] if worst else None,
+                'growth_exponent': self._growth_exponent(worst),
+                'families': families
+            }
+        return curves
+
+    @staticmethod
+    def _growth_exponent(worst: Dict[int, tuple]) -> float:
+        """Log-log slope of worst-case time between the smallest and largest size (1 = linear)"""
+        sizes = sorted(worst)
+        if len(sizes) < 2:
+            return None
+        (t1, _), (t2, _) = worst[sizes[0]], worst[sizes[-1]]
+        if t1 <= 0 or t2 <= 0:
+            return None
+        return round(math.log(t2 / t1) / math.log(sizes[-1] / sizes[0]), 2)
+
+    def run(self, corpus: List[str], sizes: List[int]) -> Dict:
+        print(f"\nProfiling {len(self.patterns)} patterns over {len(corpus)} corpus inputs...")
+        ranked = self.profile_corpus(corpus)
+        print(f"Profiling growth on adversarial inputs at sizes {sizes}...")
+        curves = self.growth_curves(sizes)
+
+        largest = max(sizes)
+        for row in ranked:
+            curve = curves[row['pattern']]
+            row['adversarial_ms'] = curve['worst_ms'].get(largest)
+            row['worst_family'] = curve['worst_family']
+            row['growth_exponent'] = curve['growth_exponent']
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'corpus_size': len(corpus),
+            'sizes': sizes,
+            'ranked_by_corpus_cost': ranked,
+            'ranked_by_adversarial_cost': sorted(
+                ranked, key=lambda r: r['adversarial_ms'] or 0, reverse=True),
+            'growth_curves': curves
+        }
+
+    def print_profile(self, report: Dict, top: int = 15):
+        """Print ranked per-pattern cost tables"""
+        print("\n" + "="*80)
+        print("PER-PATTERN COST PROFILE")
+        print("="*80)
+
+        print(f"\n🐢 TOP {top} PATTERNS BY CORPUS COST ({report['corpus_size']} inputs)")
+        print("-"*80)
+        print(f"  {'pattern':32s} {'severity':9s} {'engine':6s} {'corpus ms':>10s}")
+        for row in report['ranked_by_corpus_cost'][:top]:
+            print(f"  {row['pattern']:32s} {row['severity']:9s} {row['engine']:6s} {row['corpus_ms']:10.4f}")
+
+        largest = max(report['sizes'])
+        print(f"\n💣 TOP {top} PATTERNS BY ADVERSARIAL COST (worst input at {largest} chars)")
+        print("-"*80)
+        print(f"  {'pattern':32s} {'worst input':18s} {'ms':>10s} {'growth':>7s}")
+        for row in report['ranked_by_adversarial_cost'][:top]:
+            growth = row['growth_exponent']
+            growth = f"n^{growth:.2f}" if growth is not None else "-"
+            print(f"  {row['pattern']:32s} {str(row['worst_family']):18s} "
+                  f"{row['adversarial_ms'] or 0:10.4f} {growth:>7s}")
+
+        superlinear = [r for r in report['ranked_by_adversarial_cost']
+                       if r['growth_exponent'] is not None and r['growth_exponent'] > 1.5]
+        if superlinear:
+            print("\n⚠️  SUPERLINEAR PATTERNS (growth exponent > 1.5)")
+            print("-"*80)
+            for row in superlinear:
+                curve = report['growth_curves'][row['pattern']]['worst_ms']
+                points = ", ".join(f"{size}: {ms:.3f}ms" for size, ms in sorted(curve.items()))
+                print(f"  • {row['pattern']}: {points}")
+
+        print("\n" + "="*80)
+
+
+def run_profile(sizes: List[int], backend: str = None) -> Dict:
+    """Run the per-pattern profiler and save its report"""
+    print("\n🔬 Initializing TerminalGuard pattern profiler...")
+    corpus = [t.input_text for t in create_test_database()] + load_audit_commands()
+
+    profiler = PatternProfiler(backend)
+    report = profiler.run(corpus, sizes)
+    profiler.print_profile(report)
+
+    output_file = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'pattern_profile.json'
+    )
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Full profile saved to: {output_file}")
+    return report
+
+
+def measure_entropy_cost(sizes: List[int], repeats: int = 5) -> Dict:
+    """Time the high-entropy engine per KB of input, on command-like and random text"""
+    print("\n🔬 Measuring high-entropy engine cost...")
+    settings = dict(ConfigManager().get_entropy_settings(), enabled=True)
+    engine = EntropyEngine.from_settings(settings)
+    commands = [t.input_text for t in create_test_database()] + load_audit_commands()
+    rng = random.Random(11)
+
+    report = {'numpy': engine.vectorized, 'sizes': {}}
+    for size in sizes:
+        inputs = {
+            'commands': ' ; '.join(commands * (size // max(1, len(' ; '.join(commands))) + 1))[:size],
+            'random_tokens': ''.join(rng.choice(string.ascii_letters + string.digits + ' ')
+                                     for _ in range(size)),
+        }
+        row = {}
+        for label, text in inputs.items():
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                engine.scan(text)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            row[label] = round(best * 1e6 / (size / 1024), 2)
+        report['sizes'][size] = row
+
+    print("="*80)
+    print(f"⏱️  HIGH-ENTROPY ENGINE COST (µs per KB, {'NumPy' if engine.vectorized else 'pure Python'})")
+    print("="*80)
+    for size, row in report['sizes'].items():
+        print(f"  {size:>8} bytes: " + ", ".join(f"{label} {cost:.1f}µs/KB" for label, cost in row.items()))
+    print("="*80)
+    return report
+
+
+def measure_engine_speedup(backends: List[str] = None, repeats: int = 5) -> Dict:
+    """
+    Time the scan engine's full scan and first_hit against the plain per-pattern
+    re finditer loop, per regex backend, on the benchmark corpus, the audit log
+    and adversarial inputs. The engine is warmed first, so its one-off
+    compilation is reported separately as cold_ms.
+    """
+    print("\n🔬 Measuring scan engine speedup over the per-pattern loop...")
+    base = ConfigManager().get_patterns()
+    corpora = {
+        'benchmark': [t.input_text for t in create_test_database()],
+        'audit_log': load_audit_commands(),
+        'adversarial': list(create_adversarial_inputs(1024).values()),
+    }
+    reference = [(info, re.compile(info['regex'].pattern)) for info in base.values()]
+
+    def reference_scan(text):
+        hits = []
+        for info, regex in reference:
+            if info.get('validator') is None:
+                hits += [match.span() for match in regex.finditer(text)]
+            else:
+                hits += [match.span() for match in
+                         valid_matches(info, text, 0, lambda pos: regex.finditer(text, pos))]
+        return hits
+
+    def best_of(scan, texts):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for text in texts:
+                scan(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    report = {}
+    for name in backends or [n for n, b in BACKENDS.items() if b.available()]:
+        backend = get_backend(name)
+        patterns = {}
+        for pattern_name, info in base.items():
+            regex, engine = compile_pattern(info['regex'].pattern, backend)
+            patterns[pattern_name] = dict(info, regex=regex, engine=engine)
+        engine = ScanEngine(patterns, backend)
+
+        start = time.perf_counter()
+        engine.warm()
+        row = {'cold_ms': round((time.perf_counter() - start) * 1000, 1), 'corpora': {}}
+        for corpus_name, texts in corpora.items():
+            if not texts:
+                continue
+            reference_ms = best_of(reference_scan, texts)
+            scan_ms = best_of(engine.scan, texts)
+            first_hit_ms = best_of(engine.first_hit, texts)
+            row['corpora'][corpus_name] = {
+                'inputs': len(texts),
+                'reference_ms': round(reference_ms, 2),
+                'scan_ms': round(scan_ms, 2),
+                'first_hit_ms': round(first_hit_ms, 2),
+                'scan_speedup': round(reference_ms / scan_ms, 2),
+                'first_hit_speedup': round(reference_ms / first_hit_ms, 2),
+            }
+        report[name] = row
+
+    print("="*80)
+    print(f"⏱️  SCAN ENGINE vs PER-PATTERN LOOP (best of {repeats}, warmed)")
+    print("="*80)
+    for name, row in report.items():
+        print(f"  backend {name} (one-off compilation {row['cold_ms']:.1f}ms)")
+        for corpus_name, r in row['corpora'].items():
+            print(f"    {corpus_name:12s} {r['inputs']:5d} inputs   reference {r['reference_ms']:8.2f}ms   "
+                  f"scan {r['scan_ms']:8.2f}ms ({r['scan_speedup']}x)   "
+                  f"first_hit {r['first_hit_ms']:8.2f}ms ({r['first_hit_speedup']}x)")
+    print("="*80)
+    return report
+
+
+# What each entry point does before it can scan its first input
+STARTUP_ENTRY_POINTS = {
+    'command_interceptor': "import command_interceptor; from config_manager import ConfigManager; "
+                           "from secret_detector import SecretDetector; "
+                           "SecretDetector(ConfigManager()).detect('echo warmup')",
+    'mcp_middleware': "import mcp_middleware; from config_manager import ConfigManager; "
+                      "from secret_detector import SecretDetector; "
+                      "SecretDetector(ConfigManager()).detect('echo warmup')",
+    'dashboard_api': "import dashboard_api",
+    'benchmark': "import benchmark; benchmark.TerminalGuardBenchmark().detector.detect('echo warmup')",
+}
+
+
+def measure_startup(runs: int = 5) -> Dict:
+    """Time each entry point from process launch to its first scan, without and with the config snapshot"""
+    print("\n🔬 Measuring startup time per entry point...")
+    here = os.path.dirname(os.path.abspath(__file__))
+    config_file = ConfigManager().config_file
+    snapshot_dir = os.path.dirname(snapshot_path(config_file, 'x'))
+    prefix = f"{os.path.basename(config_file)}."
+
+    def drop_snapshots():
+        if os.path.isdir(snapshot_dir):
+            for entry in os.listdir(snapshot_dir):
+                if entry.startswith(prefix) and entry.endswith('.snapshot.json'):
+                    os.remove(os.path.join(snapshot_dir, entry))
+
+    def launch(code):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, result
+
+    report = {}
+    for name, code in STARTUP_ENTRY_POINTS.items():
+        cold, warm = [], []
+        error = None
+        for _ in range(runs):
+            drop_snapshots()
+            elapsed, result = launch(code)
+            if result.returncode != 0:
+                error = (result.stderr.strip().splitlines() or ['failed'])[-1]
+                break
+            cold.append(elapsed)
+            warm.append(launch(code)[0])
+        if error:
+            report[name] = {'error': error}
+        else:
+            report[name] = {
+                'cold_ms': round(sorted(cold)[len(cold) // 2], 1),
+                'snapshot_ms': round(sorted(warm)[len(warm) // 2], 1)
+            }
+
+    print("="*80)
+    print(f"⏱️  STARTUP TIME (median of {runs}, process launch to first scan)")
+    print("="*80)
+    for name, row in report.items():
+        if 'error' in row:
+            print(f"  {name:22s} unavailable: {row['error']}")
+        else:
+            print(f"  {name:22s} no snapshot {row['cold_ms']:8.1f}ms   snapshot {row['snapshot_ms']:8.1f}ms")
+    print("="*80)
+    return report
+
+
 def main():
     """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="TerminalGuard benchmark suite")
+    parser.add_argument('--profile', action='store_true',
+                        help="time each pattern on its own over the corpus and adversarial inputs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 1024, 4096, 16384],
+                        help="adversarial input sizes for the growth curves (with --profile)")
+    parser.add_argument('--backend', choices=['re', 're2'],
+                        help="regex engine to profile with (default: detection.regex_backend)")
+    parser.add_argument('--entropy', action='store_true',
+                        help="measure the high-entropy engine's cost per KB at each --sizes input size")
+    parser.add_argument('--startup', action='store_true',
+                        help="time each entry point's startup with and without the config snapshot")
+    parser.add_argument('--engine', action='store_true',
+                        help="time the scan engine against the per-pattern re loop (per --backend, or every installed one)")
+    args = parser.parse_args()
+
+    if args.profile:
+        return run_profile(args.sizes, args.backend)
+    if args.entropy:
+        return measure_entropy_cost(args.sizes)
+    if args.startup:
+        return measure_startup()
+    if args.engine:
+        return measure_engine_speedup([args.backend] if args.backend else None)
+
     print("\n🚀 Initializing TerminalGuard Benchmark...")
 
     # Create test database
@@ -0,0 +1,65 @@
+import sys
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency. After failure_threshold consecutive
+    failures the breaker opens and allow() refuses calls; after
+    reset_timeout_s one probe call is let through (half-open) and its
+    outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout_s=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                # Exactly one caller gets to probe
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"[BREAKER] ✅ {self.name} recovered, closing circuit", file=sys.stderr)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"[BREAKER] ⚠️ {self.name} failing, opening circuit for {self.reset_timeout_s}s",
+                          file=sys.stderr)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def trip(self):
+        """Open the circuit right away, e.g. when the dependency is unreachable at startup"""
+        with self._lock:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trips += 1
+
+    def stats(self):
+        return {'state': self.state, 'failures': self.failures, 'trips': self.trips}
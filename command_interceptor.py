@@ -27,7 +27,7 @@ def main():
     try:
         config_manager = ConfigManager()
         detector = SecretDetector(config_manager)
-        logger = AuditLogger()
+        logger = AuditLogger(settings=config_manager.get_audit_settings())
         terminal = TerminalHandler()
     except Exception as e:
         print(f"Error initializing components: {e}")
@@ -47,6 +47,8 @@ def main():
         
         if user_input.lower() == 'logs':
             print("\n--- Recent Audit Logs ---")
+            # Include events still queued for the background writer
+            logger.flush(timeout=2)
             logs = logger.get_recent_logs(5)
             for log in logs:
                 print(f"{log['timestamp']} | {log['action']} | {log['command'][:50]}")
@@ -54,8 +56,10 @@ def main():
             continue
         
         if user_input.lower() == 'reload':
-            detector.reload_patterns()
-            print("[SYSTEM] Configuration reloaded successfully!\n")
+            if detector.reload_patterns():
+                print("[SYSTEM] Configuration reloaded successfully!\n")
+            else:
+                print("[SYSTEM] ❌ Configuration rejected, still using the previous patterns (see the error above)\n")
             continue
         
         if not user_input.strip():
@@ -77,16 +81,19 @@ def main():
                 print(f"   Found: {secret['match']}")
             print("!" * 60)
             
+            # Only the masked command goes to the audit log
+            masked, findings = detector.redact(user_input, secrets)
+            
             # Ask user for confirmation
             proceed = get_user_confirmation()
             
             if proceed:
                 print("\n[ALLOWED] Running command with warning logged...")
-                logger.log_event(user_input, secrets, 'ALLOWED', 'yes')
+                logger.log_event(masked, findings, 'ALLOWED', 'yes')
                 terminal.run_command(user_input)
             else:
                 print("\n[BLOCKED] Command execution cancelled for security.")
-                logger.log_event(user_input, secrets, 'BLOCKED', 'no')
+                logger.log_event(masked, findings, 'BLOCKED', 'no')
         else:
             # No secrets - run normally
             logger.log_event(user_input, [], 'ALLOWED', None)
@@ -1,6 +1,10 @@
-import yaml
 import os
 import re
+from whitelist import WhitelistMatcher
+from regex_backend import get_backend, LazyPattern
+from token_validators import get_validator
+from config_snapshot import snapshot_key, load_snapshot, save_snapshot, derive_patterns
+
 
 class ConfigManager:
     """Manages configuration loading and reloading"""
@@ -16,18 +20,34 @@ class ConfigManager:
             self.config_file = config_file
         
         self.config = None
+        self.whitelist_matcher = None
+        self._snapshot_key = None
+        self._derived = None
         self.load_config()
     
     def load_config(self):
-        """Load configuration from YAML file"""
+        """Load configuration from YAML file, or from its compiled snapshot if the file is unchanged"""
         if not os.path.exists(self.config_file):
             raise FileNotFoundError(f"Config file not found: {self.config_file}")
         
-        with open(self.config_file, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+        with open(self.config_file, 'rb') as f:
+            raw = f.read()
+        self._snapshot_key = snapshot_key(raw)
+        snapshot = load_snapshot(self.config_file, self._snapshot_key)
+        if snapshot is not None:
+            self.config = snapshot['config']
+            self._derived = snapshot['derived']
+        else:
+            # PyYAML is only imported when there is no snapshot; libyaml's C loader,
+            # when PyYAML was built with it, gives the same result several times faster
+            import yaml
+            self.config = yaml.load(raw, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+            self._derived = None
+        self.whitelist_matcher = WhitelistMatcher(self.config.get('whitelist', {}))
 
         import sys
-        print(f"[CONFIG] Loaded configuration from {self.config_file}", file=sys.stderr)
+        source = 'snapshot of ' if snapshot is not None else ''
+        print(f"[CONFIG] Loaded configuration from {source}{self.config_file}", file=sys.stderr)
         return self.config
 
     def reload_config(self):
@@ -36,19 +56,77 @@ class ConfigManager:
         print("[CONFIG] Reloading configuration...", file=sys.stderr)
         return self.load_config()
     
+    def adopt(self, other):
+        """
+        Take over another manager's loaded config. Hot reload validates a new
+        config in a fresh manager first, then moves it into the shared one, so
+        everyone holding this manager sees the config the detector scans with.
+        """
+        self.config = other.config
+        self.whitelist_matcher = other.whitelist_matcher
+        self._snapshot_key = other._snapshot_key
+        self._derived = other._derived
+    
     def get_patterns(self):
-        """Get all detection patterns as compiled regex objects"""
+        """
+        Get all detection patterns plus their prefilter literals.
+        Regexes compile on first use; the first load of a config version compiles
+        (and so validates) all of them and saves a snapshot for the next start.
+        """
         patterns = {}
         detection_config = self.config.get('detection', {})
+        backend = get_backend(self.get_regex_backend())
+        compiled = {}
+        if self._derived is None:
+            compiled, self._derived = derive_patterns(self.config, backend)
+            save_snapshot(self.config_file, self._snapshot_key, self.config, self._derived)
         if 'patterns' in detection_config:
             for name, pattern_info in detection_config['patterns'].items():
+                derived = self._derived[name]
                 patterns[name] = {
-                    'regex': re.compile(pattern_info['regex']),
+                    'regex': LazyPattern(pattern_info['regex'], backend, derived['engine'], compiled.get(name)),
+                    'engine': derived['engine'],
                     'description': pattern_info.get('description', ''),
-                    'severity': pattern_info.get('severity', 'medium')
+                    'severity': pattern_info.get('severity', 'medium'),
+                    'literals': derived['literals'],
+                    'leading_literal': derived['leading_literal'],
+                    'max_width': derived['max_width'],
+                    'validator': get_validator(pattern_info.get('validator'))
                 }
         return patterns
     
+    def get_regex_backend(self):
+        """Get the configured regex backend name ('re', 're2' or 'auto')"""
+        return self.config.get('detection', {}).get('regex_backend', 're')
+    
+    def get_scan_budget_settings(self):
+        """Get the per-scan time budget settings (disabled unless configured)"""
+        return self.config.get('detection', {}).get('scan_budget', {'enabled': False})
+    
+    def get_cache_settings(self):
+        """Get detection result cache settings"""
+        return self.config.get('detection', {}).get('cache', {'enabled': True})
+    
+    def get_stream_settings(self):
+        """Get chunk and overlap sizes for streaming scans"""
+        return self.config.get('detection', {}).get('stream', {})
+    
+    def get_entropy_settings(self):
+        """Get high-entropy token engine settings (disabled unless configured)"""
+        return self.config.get('detection', {}).get('entropy', {'enabled': False})
+    
+    def get_decoding_settings(self):
+        """Get the decoding pre-pass settings (disabled unless configured)"""
+        return self.config.get('detection', {}).get('decoding', {'enabled': False})
+    
+    def get_two_phase_settings(self):
+        """Get two-phase scanning settings (disabled unless configured)"""
+        return self.config.get('detection', {}).get('two_phase', {'enabled': False})
+    
+    def get_hot_reload_settings(self):
+        """Get config file watching settings (disabled unless configured)"""
+        return self.config.get('detection', {}).get('hot_reload', {'enabled': False})
+    
     def is_detection_enabled(self):
         """Check if detection is enabled"""
         return self.config.get('detection', {}).get('enabled', True)
@@ -63,18 +141,7 @@ class ConfigManager:
     
     def is_whitelisted(self, command):
         """Check if a command is whitelisted"""
-        whitelist = self.get_whitelist()
-        
-        # Check exact command matches
-        if command.strip() in whitelist['commands']:
-            return True
-        
-        # Check pattern matches
-        for pattern in whitelist['patterns']:
-            if pattern.search(command.strip()):
-                return True
-        
-        return False
+        return self.whitelist_matcher.matches(command)
     
     def get_audit_settings(self):
         """Get audit logging settings"""
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import stat
+import sys
+from prefilter import required_literals
+from regex_backend import BACKENDS, compile_pattern
+from scan_engine import leading_literal, max_match_width
+
+# Bump whenever the snapshot layout or any derived field changes
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_key(raw):
+    """Key a snapshot by the config file bytes and everything the derived data depends on"""
+    digest = hashlib.sha256(raw)
+    digest.update(f"{SNAPSHOT_FORMAT}:{sys.version_info[:2]}".encode())
+    # Which regex engines are installed decides how each pattern compiles
+    digest.update(repr(sorted(name for name, b in BACKENDS.items() if b.available())).encode())
+    return digest.hexdigest()[:16]
+
+
+def snapshot_path(config_file, key):
+    directory = os.path.join(os.path.dirname(config_file), '__pycache__')
+    return os.path.join(directory, f"{os.path.basename(config_file)}.{key}.snapshot.json")
+
+
+def derive_patterns(config, backend):
+    """
+    Compile every pattern once (which validates it) and record what the scan
+    engine would otherwise re-derive from the regex source at each startup
+    Returns: (compiled patterns by name, derived fields by name)
+    """
+    compiled = {}
+    derived = {}
+    for name, pattern_info in config.get('detection', {}).get('patterns', {}).items():
+        regex = pattern_info['regex']
+        compiled[name], engine = compile_pattern(regex, backend)
+        derived[name] = {
+            'engine': engine,
+            'literals': required_literals(regex),
+            'leading_literal': leading_literal(regex),
+            'max_width': max_match_width(regex),
+        }
+    return compiled, derived
+
+
+def _trusted(path, config_file):
+    """
+    A snapshot decides which patterns run, so only one written by the config
+    file's owner (or by us) and writable by nobody else is used
+    """
+    st = os.stat(path)
+    owners = {os.stat(config_file).st_uid}
+    if hasattr(os, 'getuid'):
+        owners.add(os.getuid())
+    return st.st_uid in owners and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def load_snapshot(config_file, key):
+    """Return the snapshot for key, or None if there is none or it can't be read or trusted"""
+    path = snapshot_path(config_file, key)
+    try:
+        if not _trusted(path, config_file):
+            print(f"[CONFIG] Ignoring config snapshot {path}: not owned by the config owner or writable by others",
+                  file=sys.stderr)
+            return None
+        # Plain JSON data only: reading a snapshot can never run code
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[CONFIG] Ignoring unreadable config snapshot {path}: {e}", file=sys.stderr)
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        return None
+    for derived in snapshot['derived'].values():
+        derived['literals'] = tuple(derived['literals'])
+    return snapshot
+
+
+def save_snapshot(config_file, key, config, derived):
+    """Write the snapshot atomically and drop snapshots of older config versions"""
+    path = snapshot_path(config_file, key)
+    directory = os.path.dirname(path)
+    prefix = f"{os.path.basename(config_file)}."
+    try:
+        data = json.dumps({'format': SNAPSHOT_FORMAT, 'config': config, 'derived': derived})
+        if json.loads(data)['config'] != config:
+            # e.g. YAML dates or non-string keys, which JSON can't carry
+            print("[CONFIG] Config has values JSON can't represent; not writing a snapshot", file=sys.stderr)
+            return
+    except (TypeError, ValueError) as e:
+        print(f"[CONFIG] Config has values JSON can't represent; not writing a snapshot: {e}", file=sys.stderr)
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        # A fresh file (never a planted one), writable by its owner only whatever the umask
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        for entry in os.listdir(directory):
+            if entry.startswith(prefix) and entry.endswith('.snapshot.json') and entry != os.path.basename(path):
+                os.remove(os.path.join(directory, entry))
+    except OSError as e:
+        # A read-only install just keeps parsing the YAML
+        print(f"[CONFIG] Could not write config snapshot: {e}", file=sys.stderr)
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sys
+import threading
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+class ConfigWatcher:
+    """
+    Calls on_change from a background thread whenever the content of a file
+    changes. Uses inotify (inotify_simple package) when available and falls
+    back to polling the file's mtime, size and inode.
+    """
+
+    def __init__(self, path, on_change, interval=1.0, settle=0.2):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.settle = settle  # let an editor finish writing before reading
+        self.mode = 'inotify' if INotify is not None else 'poll'
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._signature = self._stat()
+        self._digest = self._hash()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _hash(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+            self._thread.start()
+            print(f"[CONFIG] Watching {self.path} for changes ({self.mode})", file=sys.stderr)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        if self.mode == 'inotify':
+            try:
+                return self._run_inotify()
+            except OSError as e:
+                print(f"[CONFIG] inotify unavailable ({e}), polling instead", file=sys.stderr)
+                self.mode = 'poll'
+        self._run_poll()
+
+    def _run_inotify(self):
+        # Watch the directory: editors often replace the file instead of writing to it
+        inotify = INotify()
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        inotify.add_watch(os.path.dirname(self.path), mask)
+        name = os.path.basename(self.path)
+        try:
+            while not self._stop.is_set():
+                events = inotify.read(timeout=int(self.interval * 1000))
+                if any(event.name == name for event in events):
+                    self._check()
+        finally:
+            inotify.close()
+
+    def _run_poll(self):
+        while not self._stop.wait(self.interval):
+            if self._stat() != self._signature:
+                self._check()
+
+    def _check(self):
+        if self._stop.wait(self.settle):
+            return
+        self._signature = self._stat()
+        digest = self._hash()
+        # Touching the file or rewriting the same bytes is not a change
+        if digest is None or digest == self._digest:
+            return
+        self._digest = digest
+        self.reloads += 1
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"[CONFIG] ❌ Reload after change failed: {e}", file=sys.stderr)
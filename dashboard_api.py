@@ -19,6 +19,12 @@ app.add_middleware(
 
 logger = AuditLogger(use_mongodb=True)
 
+# Fields each endpoint reads; projecting to them keeps unused fields off the wire.
+# The analytics endpoints never need the command text, so theirs leaves it out.
+LOG_FIELDS = ["timestamp", "command", "action", "secrets_found", "mark_detection"]
+ANALYTICS_FIELDS = ["timestamp", "action", "secrets_found", "mark_detection",
+                    "latency_ms", "secret_types", "secret_severities"]
+
 @app.get("/")
 def root():
     return {"message": "Welcome to the TerminalGuard Dashboard API!"}
@@ -39,11 +45,8 @@ def get_logs(
     count: int = Query(20, ge=1, le=100),
     action_filter: str = Query(None),
 ):
-    all_logs = logger.get_recent_logs(1000)
-    if action_filter:
-        filtered = [log for log in all_logs if log["action"] == action_filter.upper()]
-    else:
-        filtered = all_logs
+    # The action filter runs in MongoDB on the action+timestamp index
+    filtered = logger.get_recent_logs(count, LOG_FIELDS, action_filter.upper() if action_filter else None)
 
     # Return fields including mark_detection, default null if missing
     result_logs = []
@@ -59,6 +62,16 @@ def get_logs(
         })
     return {"total_logs": len(result_logs), "logs": result_logs}
 
+@app.get("/logs/since")
+def get_logs_since(
+    cursor: str = Query(None),
+    limit: int = Query(1000, ge=1, le=5000),
+):
+    """Incremental reads of the file audit log: pass back next_cursor to get only newer entries"""
+    logs, next_cursor = logger.get_logs_since(cursor, limit)
+    return {"logs": [dict(log, _id=str(log["_id"])) if "_id" in log else log for log in logs],
+            "next_cursor": next_cursor}
+
 @app.post("/logs/mark_detection")
 def mark_detection(
     log_id: str = Body(...),
@@ -71,7 +84,7 @@ def mark_detection(
 
 @app.get("/statistics")
 def get_statistics():
-    logs = logger.get_recent_logs(1000)
+    logs = logger.get_recent_logs(1000, ANALYTICS_FIELDS)
     total = len(logs)
     blocked = sum(1 for log in logs if log.get("action") == "BLOCKED")
     allowed = total - blocked
@@ -119,7 +132,7 @@ def get_statistics():
 @app.get("/performance")
 def get_performance():
     """Get latency and performance metrics"""
-    logs = logger.get_recent_logs(1000)
+    logs = logger.get_recent_logs(1000, ANALYTICS_FIELDS)
 
     latencies = [log.get("latency_ms", 0) for log in logs if log.get("latency_ms")]
 
@@ -145,7 +158,7 @@ def get_performance():
 @app.get("/severity")
 def get_severity_breakdown():
     """Get detection breakdown by severity level"""
-    logs = logger.get_recent_logs(1000)
+    logs = logger.get_recent_logs(1000, ANALYTICS_FIELDS)
 
     severity_counts = defaultdict(int)
     for log in logs:
@@ -168,7 +181,7 @@ def get_severity_breakdown():
 @app.get("/trends")
 def get_trends():
     """Get time-based detection trends"""
-    logs = logger.get_recent_logs(1000)
+    logs = logger.get_recent_logs(1000, ANALYTICS_FIELDS)
 
     hourly = defaultdict(int)
     daily = defaultdict(int)
@@ -208,7 +221,7 @@ def get_resources():
 @app.get("/full-report")
 def get_full_report():
     """Get comprehensive analytics report (consolidated from analytics.py)"""
-    logs = logger.get_recent_logs(1000)
+    logs = logger.get_recent_logs(1000, ANALYTICS_FIELDS)
 
     # Basic stats
     total = len(logs)
@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+import re
+from urllib.parse import unquote_plus
+from match_record import Match
+
+# Candidate spans per encoding; each one is decoded only if the budget allows
+CANDIDATES = {
+    'json_string': re.compile(r'"((?:[^"\\]|\\.)*)"'),
+    'hex': re.compile(r'\b(?:[0-9a-fA-F]{2}){16,}\b'),
+    'base64': re.compile(r'[A-Za-z0-9+/_-]{16,}={0,2}'),
+    'url': re.compile(r'[^\s"\']+'),
+}
+HEX_SPAN = re.compile(r'(?:[0-9a-fA-F]{2})+')
+URL_ESCAPE = re.compile(r'%[0-9A-Fa-f]{2}')
+
+# Cheap checks that keep spans with nothing to decode out of the budget
+WORTH_DECODING = {
+    'json_string': lambda span: '\\' in span,
+    'url': URL_ESCAPE.search,
+}
+
+
+def _as_text(raw):
+    """Decoded bytes are only worth rescanning if they are mostly printable text"""
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    printable = sum(1 for c in text if c.isprintable() or c in '\r\n\t')
+    return text if text and printable >= 0.9 * len(text) else None
+
+
+def _decode_json_string(span):
+    try:
+        return json.loads(f'"{span}"')
+    except ValueError:
+        return None
+
+
+def _decode_hex(span):
+    return _as_text(bytes.fromhex(span))
+
+
+def _decode_base64(span):
+    # Pure hex runs are left to the hex decoder
+    if HEX_SPAN.fullmatch(span):
+        return None
+    try:
+        if '-' in span or '_' in span:
+            raw = base64.urlsafe_b64decode(span + '=' * (-len(span) % 4))
+        else:
+            raw = base64.b64decode(span + '=' * (-len(span) % 4), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return _as_text(raw)
+
+
+def _decode_url(span):
+    decoded = unquote_plus(span)
+    return decoded if decoded != span else None
+
+
+DECODERS = {
+    'json_string': _decode_json_string,
+    'hex': _decode_hex,
+    'base64': _decode_base64,
+    'url': _decode_url,
+}
+
+
+class DecodePass:
+    """
+    Opt-in pre-pass that decodes base64, URL, hex and JSON-escaped spans and
+    rescans the decoded text. Spans are decoded lazily, one at a time, until
+    the per-input byte budget runs out. Hits are reported at the position of
+    the encoded span in the original input.
+    """
+
+    def __init__(self, encodings=None, max_total_bytes=65536, max_span_bytes=16384, max_depth=2):
+        self.encodings = [e for e in (encodings or DECODERS) if e in DECODERS]
+        self.max_total_bytes = max_total_bytes
+        self.max_span_bytes = max_span_bytes
+        self.max_depth = max_depth
+        self.version = f"decode:{','.join(self.encodings)}:{max_total_bytes}:{max_span_bytes}:{max_depth}"
+        self.decoded_bytes = 0
+        self.budget_exhausted = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build the pre-pass from the detection.decoding config section (None if disabled)"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(
+            encodings=settings.get('encodings'),
+            max_total_bytes=settings.get('max_total_bytes', 65536),
+            max_span_bytes=settings.get('max_span_bytes', 16384),
+            max_depth=settings.get('max_depth', 2)
+        )
+
+    def _spans(self, text):
+        """Yield (encoding, start, end, encoded text) for each candidate span, lazily"""
+        for encoding in self.encodings:
+            worth = WORTH_DECODING.get(encoding)
+            for match in CANDIDATES[encoding].finditer(text):
+                group = 1 if match.re.groups else 0
+                span = match.group(group)
+                if worth is None or worth(span):
+                    yield encoding, match.start(group), match.end(group), span
+
+    def scan(self, text, scan, known=(), expired=None):
+        """
+        Decode candidate spans of text and rescan them
+        scan: callable returning (detected, complete) for a piece of text
+        known: hits already reported for text; decoded hits overlapping one of the same type are dropped
+        expired: optional callable; once it returns True no further span is decoded
+        Returns: (hits in original coordinates, whether every span was decoded and rescanned completely)
+        """
+        reported = [(d['type'], *d['position']) for d in known]
+        hits = []
+        complete = True
+        budget = [self.max_total_bytes]
+
+        def walk(piece, depth, outer):
+            nonlocal complete
+            for encoding, start, end, span in self._spans(piece):
+                if end - start > self.max_span_bytes:
+                    continue
+                if expired is not None and expired():
+                    # The scan's time budget is spent; the rest stays undecoded
+                    complete = False
+                    return False
+                if budget[0] < end - start:
+                    self.budget_exhausted += 1
+                    return False
+                budget[0] -= end - start
+                self.decoded_bytes += end - start
+
+                decoded = DECODERS[encoding](span)
+                if not decoded:
+                    continue
+                # Nested hits still point at the outermost encoded span
+                position = outer or (start, end)
+                found, scanned = scan(decoded)
+                complete = complete and scanned
+                for secret in found:
+                    if any(t == secret['type'] and s < position[1] and position[0] < e for t, s, e in reported):
+                        continue
+                    reported.append((secret['type'], *position))
+                    hits.append(Match(secret.meta, text, *position, encoding=encoding))
+                if depth < self.max_depth and not walk(decoded, depth + 1, position):
+                    return False
+            return True
+
+        walk(text, 1, None)
+        return hits, complete
+
+    def stats(self):
+        return {
+            'decoded_bytes': self.decoded_bytes,
+            'budget_exhausted': self.budget_exhausted
+        }
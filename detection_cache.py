@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Rough per-entry and per-hit memory cost used for the max_bytes limit
+ENTRY_OVERHEAD_BYTES = 200
+HIT_BYTES = 120
+
+
+class DetectionCache:
+    """
+    Bounded LRU cache of scan results keyed by a salted hash of the input.
+    Only (type, start, end, encoding) tuples are stored; the matched text is sliced back
+    out of the caller's input on a hit, so the cache never holds secret text.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._salt = os.urandom(16)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build a cache from the detection.cache config section (None if disabled)"""
+        if not settings or not settings.get('enabled', True):
+            return None
+        return cls(
+            max_entries=settings.get('max_entries', 4096),
+            max_bytes=settings.get('max_bytes', 4 * 1024 * 1024)
+        )
+
+    def key(self, text, version):
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'),
+                                 digest_size=16, key=self._salt).digest()
+        return version, digest
+
+    def get(self, key):
+        """Return the cached (type, start, end, encoding) tuples, or None on a miss"""
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hits
+
+    def put(self, key, detected):
+        """Store the spans of a complete scan result"""
+        hits = tuple((d['type'], d['position'][0], d['position'][1], d.get('encoding')) for d in detected)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._size(self._entries.pop(key))
+            self._entries[key] = hits
+            self.bytes += self._size(hits)
+
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    @staticmethod
+    def _size(hits):
+        return ENTRY_OVERHEAD_BYTES + HIT_BYTES * len(hits)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
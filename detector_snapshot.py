@@ -0,0 +1,169 @@
+import sys
+import time
+from scan_engine import ScanEngine
+from regex_backend import get_backend, backend_report
+from scan_budget import ScanBudget
+from entropy_engine import EntropyEngine
+from decode_pass import DecodePass
+from match_record import Match, pattern_metadata
+
+TIMEOUT_METADATA = pattern_metadata('scan_timeout', 'Secret scan did not finish within its time budget', 'critical')
+
+
+class DetectorSnapshot:
+    """
+    Everything a scan reads for one config version: settings, whitelist,
+    patterns, engines and their indexes. It is built completely before it is
+    published and not reconfigured afterwards, so a scan that picked it up
+    finishes on it even if a reload publishes a newer one meanwhile.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        # Held directly, so a later reload of the manager can't change this version's whitelist
+        self.whitelist = config_manager.whitelist_matcher
+        self.enabled = config_manager.is_detection_enabled()
+        self.patterns = config_manager.get_patterns()
+        self.engine = ScanEngine(self.patterns, get_backend(config_manager.get_regex_backend()))
+        self.entropy = EntropyEngine.from_settings(config_manager.get_entropy_settings())
+        self.decoder = DecodePass.from_settings(config_manager.get_decoding_settings())
+        self.scan_budget = ScanBudget.from_settings(config_manager.get_scan_budget_settings())
+        self.stream_settings = config_manager.get_stream_settings()
+
+        # Two-phase scanning: a second engine holding only the blocking
+        # patterns answers the request path; the full set runs afterwards
+        two_phase = config_manager.get_two_phase_settings()
+        self.blocking = None
+        self.gate = None
+        if two_phase.get('enabled', False):
+            self.blocking = frozenset(two_phase.get('blocking_severities', ['critical', 'high']))
+            self.gate = ScanEngine(
+                {name: info for name, info in self.patterns.items() if info['severity'] in self.blocking},
+                self.engine.backend
+            )
+        self.version = self._version()
+        self.loaded_at = time.time()
+
+    def _version(self):
+        """Version of everything that decides scan results, used to key the cache"""
+        parts = [self.engine.version]
+        parts += [extra.version for extra in (self.entropy, self.decoder) if extra is not None]
+        return '+'.join(parts)
+
+    def warm(self):
+        """Compile everything up front, so the first scans after a swap don't pay for it"""
+        self.engine.warm()
+        if self.gate is not None:
+            self.gate.warm()
+
+    def blocking_accept(self, accept=None):
+        """Narrow an accept predicate to hits with a blocking severity"""
+        blocking = self.blocking
+        return lambda hit: hit.severity in blocking and (accept is None or accept(hit))
+
+    def is_whitelisted(self, command):
+        return self.whitelist.matches(command)
+
+    def backend_report(self):
+        return backend_report(self.patterns)
+
+    def expand(self, command, cached):
+        """Rebuild Match records from cached (type, start, end, encoding) tuples"""
+        metadata = self.engine.metadata
+        return [
+            Match(metadata[secret_type] if secret_type in metadata else self.entropy.meta,
+                  command, start, end, encoding)
+            for secret_type, start, end, encoding in cached
+        ]
+
+    def scan(self, command):
+        """
+        Run the scan engine, plus the entropy and decoding passes if enabled
+        Returns: (detected secrets, whether the scan covered every pattern)
+        """
+        if self.scan_budget is None:
+            return self._scan(command, None), True
+        # One session covers the input and every decoded span, so the decode
+        # pass spends the same total_ms rather than a fresh budget per span
+        with self.scan_budget.start() as session:
+            detected = self._scan(command, session)
+        if session.incomplete:
+            self._timed_out(session)
+            if self.scan_budget.fail_closed():
+                detected.append(self.timeout_finding())
+        return detected, not session.incomplete
+
+    def _scan(self, command, session):
+        detected = self.engine.scan(command, session)
+
+        # Tokens the regex set already reported are not flagged twice
+        if self.entropy is not None:
+            detected += self.entropy.scan(command, [d['position'] for d in detected])
+
+        if self.decoder is not None:
+            detected += self._decode(command, self.engine, session, detected)
+        return detected
+
+    def _decode(self, command, engine, session, known=()):
+        """Run the decode pass; decoded text is scanned within the caller's session and deadline"""
+        if session is None:
+            return self.decoder.scan(command, lambda text: (engine.scan(text), True), known)[0]
+
+        def rescan(text):
+            return engine.scan(text, session), not session.incomplete
+
+        def expired():
+            if session.expired():
+                session.incomplete = True
+                return True
+            return False
+
+        return self.decoder.scan(command, rescan, known, expired)[0]
+
+    def _timed_out(self, session):
+        self.scan_budget.incomplete_scans += 1
+        print(f"[DETECTOR] ⚠️ Scan exceeded its time budget "
+              f"(timed out: {session.timed_out}, quarantined: {session.skipped})", file=sys.stderr)
+
+    def first_hit(self, command, accept=None, blocking_only=False):
+        """
+        Find the first accepted secret, critical patterns first
+        blocking_only: only run the blocking patterns (accept must already
+        reject the rest, see blocking_accept)
+        Returns: (Match or None, whether a miss covered every pattern)
+        """
+        engine = self.gate if blocking_only and self.gate is not None else self.engine
+        if self.scan_budget is None:
+            return self._first_hit(command, accept, blocking_only, engine, None), True
+
+        with self.scan_budget.start() as session:
+            secret = self._first_hit(command, accept, blocking_only, engine, session)
+        complete = not session.incomplete
+        if secret is None and not complete:
+            self._timed_out(session)
+            if self.scan_budget.fail_closed():
+                return self.timeout_finding(), False
+        return secret, complete
+
+    def _first_hit(self, command, accept, blocking_only, engine, session):
+        secret = engine.first_hit(command, accept, session)
+        if secret is not None:
+            return secret
+
+        entropy = self.entropy
+        if blocking_only and entropy is not None and entropy.severity not in self.blocking:
+            entropy = None
+        if entropy is not None:
+            for hit in entropy.scan(command):
+                if accept is None or accept(hit):
+                    return hit
+
+        if self.decoder is not None:
+            for hit in self._decode(command, engine, session):
+                if accept is None or accept(hit):
+                    return hit
+        return None
+
+    @staticmethod
+    def timeout_finding():
+        return Match(TIMEOUT_METADATA, '', 0, 0)
@@ -0,0 +1,138 @@
+import math
+import re
+from collections import Counter
+from match_record import Match, pattern_metadata
+
+# NumPy is imported by the first EntropyEngine, so processes that leave the
+# engine disabled don't pay for the import at startup
+np = None
+
+SECRET_TYPE = 'high_entropy_string'
+HEX_CHARS = frozenset('0123456789abcdefABCDEF')
+# Below this many tokens NumPy's per-call overhead costs more than it saves
+VECTORIZE_MIN_TOKENS = 8
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+def _class_table():
+    """Map each byte to a character class: 0 lower, 1 upper, 2 digit, 3 other"""
+    table = [3] * 256
+    for c in range(256):
+        char = chr(c)
+        if 'a' <= char <= 'z':
+            table[c] = 0
+        elif 'A' <= char <= 'Z':
+            table[c] = 1
+        elif '0' <= char <= '9':
+            table[c] = 2
+    return table
+
+
+CLASS_TABLE = _class_table()
+
+
+class EntropyEngine:
+    """
+    Flags random-looking tokens with no known prefix by Shannon entropy and
+    character-class mix. Hex-only tokens have a lower ceiling (4 bits/char)
+    and get their own threshold; hex tokens exactly as long as a common
+    digest (git SHA-1, SHA-256) are hashes, not keys, and are never flagged. Scores are computed for all tokens of an
+    input in one NumPy pass when NumPy is installed.
+    """
+
+    def __init__(self, severity='medium', min_length=20, max_length=256, min_entropy=4.5,
+                 hex_min_entropy=3.5, min_classes=2, hex_digest_lengths=(40, 64)):
+        self.severity = severity
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_entropy = min_entropy
+        self.hex_min_entropy = hex_min_entropy
+        self.min_classes = min_classes
+        self.hex_digest_lengths = frozenset(hex_digest_lengths)
+        # '=' only as trailing base64 padding, so 'NAME=value' splits at the '='
+        self.token_regex = re.compile(r'[A-Za-z0-9+/_\-]{%d,%d}={0,2}' % (min_length, max_length))
+        self.meta = pattern_metadata(SECRET_TYPE, 'High-entropy string (possible credential)', severity)
+        self.version = f"entropy:{severity}:{min_length}:{max_length}:{min_entropy}:{hex_min_entropy}:{min_classes}:{sorted(self.hex_digest_lengths)}"
+        self.vectorized = _load_numpy() is not None
+        if self.vectorized:
+            self._class_lut = np.array(CLASS_TABLE, dtype=np.int64)
+            self._hex_lut = np.array([chr(c) in HEX_CHARS for c in range(256)], dtype=np.int64)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build the engine from the detection.entropy config section (None if disabled)"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(
+            severity=settings.get('severity', 'medium'),
+            min_length=settings.get('min_length', 20),
+            max_length=settings.get('max_length', 256),
+            min_entropy=settings.get('min_entropy', 4.5),
+            hex_min_entropy=settings.get('hex_min_entropy', 3.5),
+            min_classes=settings.get('min_classes', 2),
+            hex_digest_lengths=settings.get('hex_digest_lengths', (40, 64))
+        )
+
+    def score(self, tokens):
+        """
+        Score tokens
+        Returns: (entropy in bits per char, number of character classes, is hex-only) per token
+        """
+        if not tokens:
+            return []
+        if not self.vectorized or len(tokens) < VECTORIZE_MIN_TOKENS:
+            return [self._score_one(token) for token in tokens]
+        return self._score_vectorized(tokens)
+
+    @staticmethod
+    def _score_one(token):
+        length = len(token)
+        entropy = -sum(n / length * math.log2(n / length) for n in Counter(token).values())
+        classes = len({CLASS_TABLE[ord(c)] for c in token})
+        return entropy, classes, all(c in HEX_CHARS for c in token)
+
+    def _score_vectorized(self, tokens):
+        # Tokens are ASCII by construction, so one byte per character
+        data = np.frombuffer(''.join(tokens).encode('ascii'), dtype=np.uint8).astype(np.int64)
+        lengths = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=len(tokens))
+        owner = np.repeat(np.arange(len(tokens)), lengths)
+
+        # Count each (token, byte) pair that occurs instead of a dense tokens x 256 table
+        pairs, counts = np.unique(owner * 256 + data, return_counts=True)
+        token_of_pair = pairs // 256
+        p = counts / lengths[token_of_pair]
+        entropy = np.bincount(token_of_pair, weights=-p * np.log2(p), minlength=len(tokens))
+
+        class_counts = np.bincount(owner * 4 + self._class_lut[data], minlength=len(tokens) * 4)
+        classes = (class_counts.reshape(len(tokens), 4) > 0).sum(axis=1)
+        hex_only = np.bincount(owner, weights=self._hex_lut[data], minlength=len(tokens)) == lengths
+        return list(zip(entropy.tolist(), classes.tolist(), hex_only.tolist()))
+
+    def _flagged(self, length, entropy, classes, hex_only):
+        if hex_only:
+            return entropy >= self.hex_min_entropy and length not in self.hex_digest_lengths
+        return entropy >= self.min_entropy and classes >= self.min_classes
+
+    def scan(self, text, skip=()):
+        """
+        Find high-entropy tokens in text
+        skip: spans already reported by the regex engine; tokens overlapping them are dropped
+        Returns: Match records, like ScanEngine.scan
+        """
+        matches = [m for m in self.token_regex.finditer(text)
+                   if not any(m.start() < end and start < m.end() for start, end in skip)]
+        hits = []
+        for match, scores in zip(matches, self.score([m.group(0) for m in matches])):
+            if self._flagged(match.end() - match.start(), *scores):
+                hits.append(Match(self.meta, text, *match.span()))
+        return hits
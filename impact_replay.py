@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+TerminalGuard Pattern-Change Impact Replay
+Replays stored audit commands (audit.log or MongoDB) through an old and a new
+config and reports which past decisions would flip, grouped by pattern.
+Events are streamed in batches to a pool of worker processes and the totals
+are checkpointed as batches complete, so an interrupted replay resumes where
+it left off.
+
+Audit records hold the redacted, truncated command, so a secret that was
+masked at the time can't be re-detected; the replay shows how the change
+affects what is still in the record.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict, deque
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audit_file_sink import open_segment, rotated_segments
+from config_manager import ConfigManager
+from secret_detector import SecretDetector
+
+CHECKPOINT_FORMAT = 1
+MAX_EXAMPLES = 20
+
+# Per-process detectors for the old and new config
+_old_detector = None
+_new_detector = None
+
+
+def _init_worker(old_config, new_config):
+    global _old_detector, _new_detector
+    _old_detector = SecretDetector(ConfigManager(old_config))
+    _new_detector = SecretDetector(ConfigManager(new_config))
+
+
+def _blocking_types(detector, command):
+    """Return (all detected types, types that would block the call)"""
+    detected = detector.detect(command)
+    blocking = detector.blocking_severities
+    types = set(detected.types)
+    if blocking is None:
+        return types, types
+    return types, {m.type for m in detected if m.severity in blocking}
+
+
+def _replay_batch(batch):
+    """
+    Replay one batch of (event id, raw record) pairs through both configs
+    Returns: the batch's counters, to be folded into the report in order
+    """
+    result = {'events': 0, 'skipped': 0, 'blocked_old': 0, 'blocked_new': 0,
+              'by_pattern': defaultdict(Counter), 'examples': []}
+    for event_id, record in batch:
+        if isinstance(record, (bytes, str)):
+            try:
+                record = json.loads(record)
+            except ValueError:
+                result['skipped'] += 1
+                continue
+        command = record.get('command') if isinstance(record, dict) else None
+        if not command:
+            result['skipped'] += 1
+            continue
+        result['events'] += 1
+
+        old_types, old_blocking = _blocking_types(_old_detector, command)
+        new_types, new_blocking = _blocking_types(_new_detector, command)
+        result['blocked_old'] += bool(old_blocking)
+        result['blocked_new'] += bool(new_blocking)
+
+        for name in new_types - old_types:
+            result['by_pattern'][name]['gained'] += 1
+        for name in old_types - new_types:
+            result['by_pattern'][name]['lost'] += 1
+
+        change = None
+        if new_blocking and not old_blocking:
+            change = 'newly_blocked'
+            for name in new_blocking:
+                result['by_pattern'][name][change] += 1
+        elif old_blocking and not new_blocking:
+            change = 'newly_allowed'
+            for name in old_blocking:
+                result['by_pattern'][name][change] += 1
+
+        if change and len(result['examples']) < MAX_EXAMPLES:
+            result['examples'].append({
+                'id': event_id, 'change': change, 'command': command[:120],
+                'old': sorted(old_blocking), 'new': sorted(new_blocking)
+            })
+    return result
+
+
+def read_audit_file(path, position=None, batch_size=2000):
+    """
+    Stream raw audit log lines in batches: the rotated segments oldest first,
+    then the active file, starting at a position from an earlier batch
+    Yields: (position after the batch, [(segment:line offset, raw line), ...])
+    A position names the rotated segment it points into; for the active file
+    it holds the file's inode and the newest segment that existed then, so a
+    resume after a rotation finds the same bytes in the segment they moved to.
+    """
+    segments = rotated_segments(path)
+    files = [(name, segment, None) for name, segment in segments]
+    newest = segments[-1][0] if segments else None
+    try:
+        files.append((None, path, os.stat(path).st_ino))
+    except FileNotFoundError:
+        pass
+
+    start, offset = 0, 0
+    if position:
+        if position['segment'] is not None:
+            names = [name for name, _, _ in files[:len(segments)]]
+            start = next((i for i, name in enumerate(names) if name >= position['segment']), len(names))
+            if start < len(names) and names[start] == position['segment']:
+                offset = position['offset']
+        else:
+            after = position['after']
+            start = next((i for i, (name, _, _) in enumerate(files[:len(segments)])
+                          if after is None or name > after), len(segments))
+            if start < len(segments):
+                # The active file was rotated into the first newer segment
+                offset = position['offset']
+            elif files[start:] and files[start][2] == position['inode']:
+                offset = position['offset']
+
+    for name, file_path, inode in files[start:]:
+        label = name or os.path.basename(path)
+        try:
+            f = open_segment(file_path)
+        except FileNotFoundError:
+            # Pruned since it was listed
+            offset = 0
+            continue
+        with f:
+            f.seek(offset)
+            batch = []
+            for line in f:
+                batch.append((f"{label}:{offset}", line))
+                offset += len(line)
+                if len(batch) >= batch_size:
+                    yield _file_position(name, newest, inode, offset), batch
+                    batch = []
+            if batch:
+                yield _file_position(name, newest, inode, offset), batch
+        offset = 0
+
+
+def _file_position(segment, newest, inode, offset):
+    if segment is not None:
+        return {'segment': segment, 'offset': offset}
+    return {'segment': None, 'after': newest, 'inode': inode, 'offset': offset}
+
+
+def read_mongo(after_id=None, batch_size=2000):
+    """
+    Stream audit records from MongoDB in _id order, starting after an _id
+    Yields: (last _id in the batch, [(_id, record), ...])
+    """
+    from bson.objectid import ObjectId
+    from mongo_handler import MongoDBHandler
+
+    handler = MongoDBHandler()
+    query = {'_id': {'$gt': ObjectId(after_id)}} if after_id else {}
+    cursor = (handler.logs_collection
+              .find(query, {'command': 1})
+              .sort('_id', 1)
+              .batch_size(batch_size))
+    batch = []
+    for record in cursor:
+        batch.append((str(record['_id']), {'command': record.get('command')}))
+        if len(batch) >= batch_size:
+            yield batch[-1][0], batch
+            batch = []
+    if batch:
+        yield batch[-1][0], batch
+
+
+def config_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class ImpactReport:
+    """Running totals of a replay, which double as its checkpoint"""
+
+    def __init__(self, source, old_config, new_config):
+        self.identity = {
+            'format': CHECKPOINT_FORMAT,
+            'source': source,
+            'old': config_digest(old_config),
+            'new': config_digest(new_config),
+        }
+        self.position = None
+        self.totals = Counter()
+        self.by_pattern = defaultdict(Counter)
+        self.examples = []
+
+    def fold(self, position, result):
+        self.position = position
+        for key in ('events', 'skipped', 'blocked_old', 'blocked_new'):
+            self.totals[key] += result[key]
+        for name, counts in result['by_pattern'].items():
+            self.by_pattern[name].update(counts)
+        self.examples.extend(result['examples'][:MAX_EXAMPLES - len(self.examples)])
+
+    def to_dict(self):
+        return dict(self.identity, position=self.position, totals=dict(self.totals),
+                    by_pattern={name: dict(counts) for name, counts in self.by_pattern.items()},
+                    examples=self.examples)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def restore(self, path):
+        """Continue from a checkpoint of the same source and configs; returns whether one was used"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        if any(state.get(key) != value for key, value in self.identity.items()):
+            print(f"⚠️ Checkpoint {path} is for another source or config, starting over", file=sys.stderr)
+            return False
+        self.position = state['position']
+        self.totals.update(state['totals'])
+        for name, counts in state['by_pattern'].items():
+            self.by_pattern[name].update(counts)
+        self.examples = state['examples']
+        return True
+
+
+def run_replay(batches, report, old_config, new_config, workers, checkpoint=None, checkpoint_every=5.0):
+    """
+    Replay batches across worker processes and fold results in source order,
+    keeping at most 2 batches per worker in flight so memory stays flat
+    """
+    start = time.perf_counter()
+    last_save = start
+    events_at_start = report.totals['events']
+
+    def progress(final=False):
+        done = report.totals['events'] - events_at_start
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0
+        print(f"\r  {report.totals['events']:,} events replayed ({rate:,.0f}/s)",
+              end='\n' if final else '', file=sys.stderr)
+
+    def fold(position, result):
+        nonlocal last_save
+        report.fold(position, result)
+        now = time.perf_counter()
+        if checkpoint and now - last_save >= checkpoint_every:
+            report.save(checkpoint)
+            last_save = now
+            progress()
+
+    try:
+        if workers == 1:
+            _init_worker(old_config, new_config)
+            for position, batch in batches:
+                fold(position, _replay_batch(batch))
+        else:
+            # Imported here so a single-process replay doesn't pay for it
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(old_config, new_config)) as pool:
+                in_flight = deque()
+                for position, batch in batches:
+                    in_flight.append((position, pool.submit(_replay_batch, batch)))
+                    if len(in_flight) >= 2 * workers:
+                        position, future = in_flight.popleft()
+                        fold(position, future.result())
+                while in_flight:
+                    position, future = in_flight.popleft()
+                    fold(position, future.result())
+    finally:
+        # Everything folded so far is consistent with report.position, even on Ctrl-C
+        if checkpoint:
+            report.save(checkpoint)
+    progress(final=True)
+    return report
+
+
+def print_report(report):
+    totals = report.totals
+    print("\n" + "="*80)
+    print("🔀 TERMINALGUARD PATTERN-CHANGE IMPACT")
+    print("="*80)
+    print(f"\n  Events replayed: {totals['events']:,} (skipped {totals['skipped']:,})")
+    print(f"  Blocked: {totals['blocked_old']:,} → {totals['blocked_new']:,}")
+
+    rows = sorted(report.by_pattern.items(),
+                  key=lambda item: -(item[1]['newly_blocked'] + item[1]['newly_allowed']))
+    flips = [(name, counts) for name, counts in rows if counts['newly_blocked'] or counts['newly_allowed']]
+    if flips:
+        print(f"\n  {'Pattern':32s} {'newly blocked':>14s} {'newly allowed':>14s} {'gained':>8s} {'lost':>8s}")
+        for name, counts in flips:
+            print(f"  {name:32s} {counts['newly_blocked']:14,d} {counts['newly_allowed']:14,d} "
+                  f"{counts['gained']:8,d} {counts['lost']:8,d}")
+    else:
+        print("\n✅ No decision would change")
+
+    changed = [(name, counts) for name, counts in rows if (counts['gained'] or counts['lost'])
+               and not (counts['newly_blocked'] or counts['newly_allowed'])]
+    if changed:
+        print("\n  Findings changed without flipping a decision:")
+        for name, counts in changed[:15]:
+            print(f"    • {name}: +{counts['gained']:,} / -{counts['lost']:,}")
+
+    if report.examples:
+        print("\n  Examples:")
+        for example in report.examples:
+            print(f"    [{example['change']}] {example['command']!r}")
+            print(f"      old: {example['old']}  new: {example['new']}")
+    print("="*80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay audit history through an old and a new config")
+    parser.add_argument('--new', required=True, metavar='CONFIG', help="proposed config file")
+    parser.add_argument('--old', metavar='CONFIG', help="current config file (default: config.yaml)")
+    parser.add_argument('--source', default='file', choices=['file', 'mongo'], help="where to read audit events from")
+    parser.add_argument('--audit-log', default=None, help="audit log file for --source file (default: audit.log)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--batch-size', type=int, default=2000, help="events per batch")
+    parser.add_argument('--checkpoint', default='impact_replay.checkpoint.json', help="checkpoint file")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--json', metavar='FILE', help="also write the report to FILE")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    old_config = os.path.abspath(args.old or os.path.join(script_dir, 'config.yaml'))
+    new_config = os.path.abspath(args.new)
+    audit_log = args.audit_log or os.path.join(script_dir, 'audit.log')
+    source = 'mongo' if args.source == 'mongo' else os.path.abspath(audit_log)
+
+    report = ImpactReport(source, old_config, new_config)
+    if not args.restart and report.restore(args.checkpoint):
+        print(f"▶️ Resuming from {args.checkpoint} ({report.totals['events']:,} events done)", file=sys.stderr)
+
+    if args.source == 'mongo':
+        batches = read_mongo(report.position, args.batch_size)
+    else:
+        batches = read_audit_file(audit_log, report.position, args.batch_size)
+
+    run_replay(batches, report, old_config, new_config, max(1, args.workers), args.checkpoint)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2)
+        print(f"\n📄 Report saved to: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
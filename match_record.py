@@ -0,0 +1,83 @@
+import sys
+from functools import cached_property
+
+# (type, description, severity) tuples shared by every hit of a pattern
+_METADATA = {}
+
+
+def pattern_metadata(secret_type, description, severity):
+    """Return the shared, interned metadata tuple for a secret type"""
+    meta = (sys.intern(secret_type), sys.intern(description), sys.intern(severity))
+    return _METADATA.setdefault(meta, meta)
+
+
+class Match:
+    """
+    One detected secret: a pointer to shared pattern metadata plus the
+    matched substring and its offsets. Only the slice is kept, never the
+    scanned text, so a logged or cached result doesn't keep a large input alive.
+    Reads like the old hit dict (secret['type'], secret.get('encoding')).
+    """
+
+    __slots__ = ('meta', 'match', 'start', 'end', 'encoding')
+    KEYS = ('type', 'match', 'position', 'description', 'severity')
+
+    def __init__(self, meta, text, start, end, encoding=None):
+        self.meta = meta
+        self.match = text[start:end]
+        self.start = start
+        self.end = end
+        self.encoding = encoding
+
+    @property
+    def type(self):
+        return self.meta[0]
+
+    @property
+    def description(self):
+        return self.meta[1]
+
+    @property
+    def severity(self):
+        return self.meta[2]
+
+    @property
+    def position(self):
+        return self.start, self.end
+
+    def keys(self):
+        return self.KEYS + ('encoding',) if self.encoding else self.KEYS
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, (Match, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Match({self.type!r}, {self.position})"
+
+
+class DetectionResult(tuple):
+    """Detected secrets of one scan, with their types and severities computed once"""
+
+    @cached_property
+    def types(self):
+        return [m.meta[0] for m in self]
+
+    @cached_property
+    def severities(self):
+        return [m.meta[2] for m in self]
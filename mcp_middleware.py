@@ -29,7 +29,9 @@ class TerminalGuardMiddleware:
 
             self.config_manager = ConfigManager()
             self.detector = SecretDetector(self.config_manager)
-            self.logger = AuditLogger()
+            # Picks up config.yaml edits without restarting the MCP server
+            self.detector.start_watching()
+            self.logger = AuditLogger(settings=self.config_manager.get_audit_settings())
             print("[DEBUG] Python version:", sys.version, file=sys.stderr)
             print("[MIDDLEWARE] Components initialized successfully", file=sys.stderr)
         except Exception as e:
@@ -38,6 +40,8 @@ class TerminalGuardMiddleware:
             traceback.print_exc(file=sys.stderr)
             raise
         
+        # Background audit scans, awaited before the logger closes
+        self.pending = set()
         self.target_session: ClientSession = None
         self.target_tools = []
         self.stdio_context = None
@@ -93,6 +97,11 @@ class TerminalGuardMiddleware:
             if self.stdio_context:
                 await self.stdio_context.__aexit__(None, None, None)
                 print("[MIDDLEWARE] Closed stdio context", file=sys.stderr)
+            
+            # Let background audit scans finish, then write out the events still queued
+            if self.pending:
+                await asyncio.gather(*self.pending, return_exceptions=True)
+            self.logger.close()
         
         except Exception as e:
             print(f"[MIDDLEWARE] Error during cleanup: {e}", file=sys.stderr)
@@ -202,48 +211,38 @@ class TerminalGuardMiddleware:
         print(f"[MIDDLEWARE] Intercepting: {tool_name}", file=sys.stderr)
         print(f"[MIDDLEWARE] Arguments: {args_str[:200]}", file=sys.stderr)
 
-        # Scan for secrets
-        detected_secrets = self.detector.detect(args_str)
+        # Only the first real (non-filtered) hit is needed to decide on blocking
+        def is_real(secret):
+            return bool(self.filter_false_positives(tool_name, arguments, [secret]))
 
-        # Filter out false positives based on tool context
-        secrets = self.filter_false_positives(tool_name, arguments, detected_secrets)
+        # With two-phase scanning only the blocking severities run here
+        first_secret, gate_complete = self.detector.check_first(args_str, accept=is_real, blocking_only=True)
+        # The scan budget can only interrupt a regex in the main thread, so an
+        # input the gate had to abort is not rescanned in a worker thread
+        full_scan = gate_complete and not (first_secret and first_secret['type'] == 'scan_timeout')
 
         # Calculate detection latency
         detection_latency_ms = (time.perf_counter() - start_time) * 1000
 
-        if detected_secrets and not secrets:
-            print(f"[MIDDLEWARE] ✅ All {len(detected_secrets)} detection(s) were false positives, filtered out", file=sys.stderr)
-        
-        if secrets:
+        if first_secret:
             # Secret detected - BLOCK
             
-            print(f"[MIDDLEWARE] ⚠️ BLOCKED: {len(secrets)} secret(s) detected!", file=sys.stderr)
+            print(f"[MIDDLEWARE] ⚠️ BLOCKED: {first_secret['type']} detected!", file=sys.stderr)
             
             warning = "🚨 SECURITY ALERT - TerminalGuard 🚨\n\n"
-            warning += f"Detected {len(secrets)} secret(s) in your '{tool_name}' request:\n\n"
-            
-            for i, secret in enumerate(secrets, 1):
-                warning += f"{i}. {secret['type'].upper()} (Severity: {secret['severity']})\n"
-                warning += f"   {secret['description']}\n"
-                warning += f"   Detected: {secret['match'][:30]}...\n\n"
-            
+            warning += f"Detected a secret in your '{tool_name}' request:\n\n"
+            warning += f"1. {first_secret['type'].upper()} (Severity: {first_secret['severity']})\n"
+            warning += f"   {first_secret['description']}\n"
+            warning += f"   Detected: {first_secret['match'][:30]}...\n\n"
+            warning += "The request may contain more secrets; all findings are recorded in the audit log.\n\n"
             warning += "❌ Operation BLOCKED to protect sensitive information.\n"
             warning += "Please remove secrets and try again."
             
-            print("[DEBUG] About to log the blocked attempt...", file=sys.stderr)
-            try:
-                self.logger.log_event(
-                    command=f"MCP:{tool_name} - {args_str[:100]}",
-                    secrets_detected=secrets,
-                    action='BLOCKED',
-                    user_choice='automatic',
-                    latency_ms=round(detection_latency_ms, 3)
-                )
-                print(f"[DEBUG] Blocked attempt logged successfully. Latency: {detection_latency_ms:.3f}ms", file=sys.stderr)
-            except Exception as e:
-                print(f"[ERROR] Failed to log blocked attempt: {e}", file=sys.stderr)
-                import traceback
-                traceback.print_exc()
+            if full_scan:
+                # Enumerate every finding for the audit record off the request path
+                self.in_background(self.log_blocked, tool_name, arguments, args_str, first_secret, detection_latency_ms)
+            else:
+                self.log_blocked(tool_name, arguments, args_str, first_secret, detection_latency_ms, full_scan=False)
             
             return [TextContent(type="text", text=warning)]
         
@@ -253,14 +252,18 @@ class TerminalGuardMiddleware:
         try:
             result = await self.target_session.call_tool(tool_name, arguments)
 
-            # Log successful call
-            self.logger.log_event(
-                command=f"MCP:{tool_name} - {args_str[:100]}",
-                secrets_detected=[],
-                action='ALLOWED',
-                user_choice=None,
-                latency_ms=round(detection_latency_ms, 3)
-            )
+            if self.detector.two_phase and full_scan:
+                # The full pattern set runs in the background and fills in the audit record
+                self.in_background(self.log_allowed, tool_name, arguments, args_str, detection_latency_ms)
+            else:
+                # Log successful call
+                self.logger.log_event(
+                    command=f"MCP:{tool_name} - {args_str[:100]}",
+                    secrets_detected=[],
+                    action='ALLOWED',
+                    user_choice=None,
+                    latency_ms=round(detection_latency_ms, 3)
+                )
 
             return result.content
         
@@ -269,6 +272,56 @@ class TerminalGuardMiddleware:
             print(f"[MIDDLEWARE] ❌ {error_msg}", file=sys.stderr)
             return [TextContent(type="text", text=error_msg)]
     
+    def in_background(self, func, *args):
+        """Run func in the default executor, tracked so cleanup() can wait for it"""
+        future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+        self.pending.add(future)
+        future.add_done_callback(self.pending.discard)
+        return future
+    
+    def log_blocked(self, tool_name: str, arguments: dict, args_str: str, first_secret: dict, latency_ms: float,
+                    full_scan: bool = True):
+        """Run the full scan for a blocked call (unless full_scan is off) and write its audit record"""
+        print("[DEBUG] About to log the blocked attempt...", file=sys.stderr)
+        try:
+            secrets = []
+            if full_scan:
+                secrets = self.filter_false_positives(tool_name, arguments, self.detector.detect(args_str))
+            # Mask before truncating so no part of a secret reaches the audit log
+            masked, findings = self.detector.redact(args_str, secrets or [first_secret])
+            self.logger.log_event(
+                command=f"MCP:{tool_name} - {masked[:100]}",
+                secrets_detected=findings,
+                action='BLOCKED',
+                user_choice='automatic',
+                latency_ms=round(latency_ms, 3)
+            )
+            print(f"[DEBUG] Blocked attempt logged successfully. Latency: {latency_ms:.3f}ms", file=sys.stderr)
+        except Exception as e:
+            print(f"[ERROR] Failed to log blocked attempt: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+    
+    def log_allowed(self, tool_name: str, arguments: dict, args_str: str, latency_ms: float):
+        """Run the full scan for a call that passed the blocking gate and write its audit record"""
+        try:
+            secrets = self.filter_false_positives(tool_name, arguments, self.detector.detect(args_str))
+            masked, findings = self.detector.redact(args_str, secrets)
+            if findings:
+                print(f"[MIDDLEWARE] ⚠️ Allowed call contained non-blocking findings: "
+                      f"{', '.join(f['type'] for f in findings)}", file=sys.stderr)
+            self.logger.log_event(
+                command=f"MCP:{tool_name} - {masked[:100]}",
+                secrets_detected=findings,
+                action='ALLOWED',
+                user_choice=None,
+                latency_ms=round(latency_ms, 3)
+            )
+        except Exception as e:
+            print(f"[ERROR] Failed to log allowed call: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+    
     async def manual_scan(self, text: str) -> list[TextContent]:
         """Manually scan text for secrets"""
         secrets = self.detector.detect(text)
@@ -299,6 +352,16 @@ class TerminalGuardMiddleware:
         result += f"Secrets Detected: {secrets_found}\n"
         result += f"Block Rate: {(blocked/total*100):.1f}%" if total > 0 else "Block Rate: 0%"
         
+        writer = self.logger.get_writer_stats()
+        if writer.get('enabled', True):
+            result += f"\nAudit Queue: {writer['depth']}/{writer['capacity']} "
+            result += f"(peak {writer['max_depth']}, dropped {writer['dropped']})"
+        
+        spool = self.logger.get_spool_stats()
+        if spool.get('enabled', True):
+            result += f"\nMongoDB Circuit: {spool['circuit']['state']} "
+            result += f"(spool backlog {spool['pending_bytes']} bytes)"
+        
         return [TextContent(type="text", text=result)]
     
     async def run(self):
@@ -1,9 +1,33 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 from bson.objectid import ObjectId
+import argparse
+import json
 import os
 import certifi
 import sys
 
+DUPLICATE_KEY = 11000
+
+# Entries are written with mark_detection: None and marked later with the
+# dashboard's "true" / "false" strings, so only marked entries have a string
+MARKED = {'mark_detection': {'$type': 'string'}}
+
+# Indexes the handler's reads rely on, created and verified at startup
+INDEXES = [
+    IndexModel([('timestamp', DESCENDING)], name='timestamp_desc'),
+    IndexModel([('action', ASCENDING), ('timestamp', DESCENDING)], name='action_timestamp'),
+    IndexModel([('mark_detection', ASCENDING)], name='mark_detection_marked', partialFilterExpression=MARKED),
+]
+
+# The dashboard's read shapes, for explain diagnostics
+DIAGNOSTIC_QUERIES = {
+    'recent_logs': lambda c: c.find({}, ['timestamp', 'action', 'secrets_found']).sort('timestamp', DESCENDING).limit(1000),
+    'recent_by_action': lambda c: c.find({'action': 'BLOCKED'}).sort('timestamp', DESCENDING).limit(100),
+    # Must state the index's filter for the planner to use the partial index
+    'marked_logs': lambda c: c.find(MARKED),
+}
+
 
 class MongoDBHandler:
     """MongoDB handler for audit logs"""
@@ -33,6 +57,69 @@ class MongoDBHandler:
 
         self.db = self.client['terminalguard']
         self.logs_collection = self.db['audit_logs']
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """
+        Create the read indexes (a no-op when they exist) and check each one
+        has the expected keys. A failure is reported, not raised: reads still
+        work without the indexes, only slower.
+        Returns: {index name: 'ok' | 'missing' | 'mismatch: ...'}
+        """
+        report = {}
+        try:
+            self.logs_collection.create_indexes(INDEXES)
+            existing = self.logs_collection.index_information()
+        except Exception as e:
+            print(f"[MONGODB ERROR] Could not create indexes: {e}", file=sys.stderr)
+            return {model.document['name']: f"error: {e}" for model in INDEXES}
+
+        for model in INDEXES:
+            spec = model.document
+            found = existing.get(spec['name'])
+            if found is None:
+                report[spec['name']] = 'missing'
+            elif (list(found['key']) != list(spec['key'].items())
+                  or found.get('partialFilterExpression') != spec.get('partialFilterExpression')):
+                report[spec['name']] = f"mismatch: {found['key']} {found.get('partialFilterExpression', '')}".rstrip()
+            else:
+                report[spec['name']] = 'ok'
+
+        problems = {name: state for name, state in report.items() if state != 'ok'}
+        if problems:
+            print(f"[MONGODB] ⚠️ Index check failed: {problems}", file=sys.stderr)
+        else:
+            print(f"[MONGODB] Indexes verified: {', '.join(report)}", file=sys.stderr)
+        return report
+
+    def explain_queries(self):
+        """
+        Explain the dashboard's queries
+        Returns: {query: {index used, whether it sorts in memory, keys and documents examined, time}}
+        """
+        results = {}
+        for name, query in DIAGNOSTIC_QUERIES.items():
+            try:
+                plan = query(self.logs_collection).explain()
+            except Exception as e:
+                results[name] = {'error': str(e)}
+                continue
+            stages = []
+            stage = plan.get('queryPlanner', {}).get('winningPlan', {})
+            while stage:
+                stages.append(stage)
+                stage = stage.get('inputStage') or stage.get('queryPlan')
+            stats = plan.get('executionStats', {})
+            results[name] = {
+                'index': next((s['indexName'] for s in stages if 'indexName' in s), None),
+                'in_memory_sort': any(s.get('stage') == 'SORT' for s in stages),
+                'collection_scan': any(s.get('stage') == 'COLLSCAN' for s in stages),
+                'keys_examined': stats.get('totalKeysExamined'),
+                'docs_examined': stats.get('totalDocsExamined'),
+                'returned': stats.get('nReturned'),
+                'time_ms': stats.get('executionTimeMillis'),
+            }
+        return results
 
     def insert_log(self, log_entry):
         """Insert a single log entry"""
@@ -44,13 +131,39 @@ class MongoDBHandler:
             print(f"[MONGODB ERROR] Failed to insert: {e}", file=sys.stderr)
             raise
 
-    def get_recent_logs(self, count=10):
-        """Retrieve recent log entries"""
+    def insert_logs(self, log_entries):
+        """
+        Insert a batch of log entries in one round-trip. Entries that already
+        exist (same _id, e.g. a replayed spool batch) are skipped.
+        Returns: number of entries inserted
+        """
+        try:
+            result = self.logs_collection.insert_many(log_entries, ordered=False)
+            print(f"[MONGODB] Successfully inserted {len(result.inserted_ids)} logs", file=sys.stderr)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY for error in errors):
+                print(f"[MONGODB ERROR] Failed to insert batch: {e}", file=sys.stderr)
+                raise
+            inserted = e.details.get('nInserted', 0)
+            print(f"[MONGODB] Inserted {inserted} logs, {len(errors)} already present", file=sys.stderr)
+            return inserted
+        except Exception as e:
+            print(f"[MONGODB ERROR] Failed to insert batch: {e}", file=sys.stderr)
+            raise
+
+    def get_recent_logs(self, count=10, projection=None, action=None):
+        """
+        Retrieve recent log entries, newest first
+        projection: optional list of fields to return (_id is always included)
+        action: only entries with this action (served by action_timestamp)
+        """
         try:
             logs = list(
                 self.logs_collection
-                .find()
-                .sort('timestamp', -1)
+                .find({'action': action} if action else {}, projection)
+                .sort('timestamp', DESCENDING)
                 .limit(count)
             )
             return logs
@@ -58,13 +171,13 @@ class MongoDBHandler:
             print(f"[MONGODB ERROR] Failed to read: {e}", file=sys.stderr)
             return []
 
-    def get_all_logs(self, limit=1000):
+    def get_all_logs(self, limit=1000, projection=None):
         """Get all logs with limit"""
         try:
             logs = list(
                 self.logs_collection
-                .find()
-                .sort('timestamp', -1)
+                .find({}, projection)
+                .sort('timestamp', DESCENDING)
                 .limit(limit)
             )
             return logs
@@ -83,3 +196,25 @@ class MongoDBHandler:
         except Exception as e:
             print(f"[MONGODB] ERROR updating mark_detection: {e}", file=sys.stderr)
             return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MongoDB audit log index and query diagnostics")
+    parser.add_argument('--explain', action='store_true', help="explain the dashboard's queries")
+    args = parser.parse_args()
+
+    handler = MongoDBHandler()
+    report = {'indexes': handler.ensure_indexes()}
+    if args.explain:
+        report['queries'] = handler.explain_queries()
+    print(json.dumps(report, indent=2))
+
+    problems = [name for name, result in report.get('queries', {}).items()
+                if result.get('in_memory_sort') or result.get('collection_scan')]
+    if problems:
+        print(f"⚠️ Queries not served by an index: {', '.join(problems)}", file=sys.stderr)
+    return 1 if problems or any(state != 'ok' for state in report['indexes'].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import re
+from regex_backend import BACKENDS, LazyPattern
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Non-ASCII characters that (?i) matching treats as equal to an ASCII letter
+_ASCII_FOLDS = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+def fold(text):
+    """Lower-case text the same way the prefilter literals are stored"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(_ASCII_FOLDS).lower()
+
+
+def _best(options):
+    """Pick the most selective any-of literal set: longest shortest member, then fewest members"""
+    options = [o for o in options if o]
+    if not options:
+        return None
+    return max(options, key=lambda o: (min(len(s) for s in o), -len(o)))
+
+
+def _required(items):
+    """Return a set of literals at least one of which every match must contain, or None"""
+    options = []
+    run = []
+
+    for op, av in items:
+        if op is sre_parse.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+
+        if run:
+            options.append({''.join(run)})
+            run = []
+
+        if op is sre_parse.SUBPATTERN:
+            options.append(_required(av[-1].data))
+        elif op is sre_parse.BRANCH:
+            branches = [_required(branch.data) for branch in av[1]]
+            if all(branches):
+                options.append(set().union(*branches))
+        elif op in _REPEATS and av[0] >= 1:
+            options.append(_required(av[2].data))
+
+    if run:
+        options.append({''.join(run)})
+
+    return _best(options)
+
+
+def required_literals(regex):
+    """
+    Extract the literals a pattern cannot match without
+    Returns: sorted tuple of lower-cased literals (any one of them must appear),
+             or an empty tuple if the pattern has no literal anchor
+    """
+    try:
+        literals = _required(sre_parse.parse(regex).data)
+    except (re.error, RecursionError):
+        return ()
+    return tuple(sorted(literals)) if literals else ()
+
+
+def _trie_regex(words):
+    """Build a prefix-factored alternation that matches the longest word at a position"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class LiteralPrefilter:
+    """Maps the literals found in an input to the patterns that could possibly match it"""
+
+    def __init__(self, patterns):
+        self.always = set()
+        self.by_literal = {}
+
+        for name, pattern_info in patterns.items():
+            literals = pattern_info.get('literals', ())
+            if not literals:
+                self.always.add(name)
+            for literal in literals:
+                self.by_literal.setdefault(literal, []).append(name)
+
+        # The scan reports only the longest literal starting at each position,
+        # so a hit also stands for every shorter literal contained in it
+        self.implied = {
+            literal: [other for other in self.by_literal if other in literal]
+            for literal in self.by_literal
+        }
+
+        self.regex = None
+        if self.by_literal:
+            # Compiled on the first scan; a large alternation is slow to compile
+            self.regex = LazyPattern(f'(?=({_trie_regex(self.by_literal)}))', BACKENDS['re'])
+
+    def candidates(self, text):
+        """Return the names of the patterns worth running on text"""
+        if self.regex is None:
+            return set(self.always)
+
+        found = {match.group(1) for match in self.regex.finditer(fold(text))}
+        names = set(self.always)
+        for literal in found:
+            for implied in self.implied[literal]:
+                names.update(self.by_literal[implied])
+        return names
@@ -0,0 +1,53 @@
+from scan_engine import SEVERITY_ORDER
+
+MASK = '[REDACTED:{type}]'
+
+
+def _rank(secret):
+    severity = secret.get('severity')
+    return SEVERITY_ORDER.index(severity) if severity in SEVERITY_ORDER else len(SEVERITY_ORDER)
+
+
+def merge_spans(detected):
+    """
+    Merge overlapping detections in one sweep over the hits sorted by start
+    Returns: (start, end, hits in the merged span) groups, in text order
+    """
+    groups = []
+    for secret in sorted(detected, key=lambda d: d['position']):
+        start, end = secret['position']
+        if groups and start < groups[-1][1]:
+            group = groups[-1]
+            group[1] = max(group[1], end)
+            group[2].append(secret)
+        else:
+            groups.append([start, end, [secret]])
+    return groups
+
+
+def redact(text, detected, mask=MASK):
+    """
+    Mask every detected span of text
+    Returns: (masked text, one consolidated finding per merged span)
+    The finding of a merged span carries the most severe hit's type, description
+    and severity plus all types found there; it never contains the secret itself.
+    """
+    parts = []
+    findings = []
+    cursor = 0
+    for start, end, hits in merge_spans(detected):
+        primary = min(hits, key=_rank)
+        label = mask.format(type=primary['type'])
+        parts.append(text[cursor:start])
+        parts.append(label)
+        cursor = end
+        findings.append({
+            'type': primary['type'],
+            'types': list(dict.fromkeys(h['type'] for h in hits)),
+            'match': label,
+            'position': (start, end),
+            'description': primary.get('description', ''),
+            'severity': primary.get('severity', 'unknown')
+        })
+    parts.append(text[cursor:])
+    return ''.join(parts), findings
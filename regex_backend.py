@@ -0,0 +1,118 @@
+import re
+import sys
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+class RegexBackend:
+    """Python's backtracking re engine, always available"""
+
+    name = 're'
+
+    def available(self):
+        return True
+
+    def compile(self, regex):
+        return re.compile(regex)
+
+
+class RE2Backend(RegexBackend):
+    """
+    Google RE2 (linear time in the input size); needs the google-re2 package.
+    A safety option against catastrophic backtracking, not a speedup: the
+    Python binding's per-match overhead makes typical scans slower than re
+    (see benchmark.py --engine).
+    """
+
+    name = 're2'
+
+    def available(self):
+        return re2 is not None
+
+    def compile(self, regex):
+        if hasattr(re2, 'Options'):
+            options = re2.Options()
+            # Unsupported patterns are expected and handled by the re fallback
+            options.log_errors = False
+            compiled = re2.compile(regex, options)
+        else:
+            compiled = re2.compile(regex)
+        # Some re2 bindings quietly hand unsupported patterns back to re
+        if isinstance(compiled, re.Pattern):
+            raise ValueError("pattern not supported by RE2")
+        return compiled
+
+
+BACKENDS = {
+    're': RegexBackend(),
+    're2': RE2Backend(),
+}
+
+# What 'auto' resolves to: the fastest backend on the benchmark corpus
+AUTO_BACKEND = 're'
+
+
+def get_backend(name='re'):
+    """Resolve a configured backend name to an available backend"""
+    if name == 'auto':
+        name = AUTO_BACKEND
+
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown regex backend: {name}")
+    if not backend.available():
+        print(f"[REGEX] Backend '{name}' is not installed, using re", file=sys.stderr)
+        return BACKENDS['re']
+    return backend
+
+
+def compile_pattern(regex, backend):
+    """
+    Compile a pattern with the backend, falling back to re if the backend can't express it
+    Returns: (compiled pattern, name of the engine that compiled it)
+    """
+    if backend.name != 're':
+        try:
+            return backend.compile(regex), backend.name
+        except Exception:
+            pass
+    return re.compile(regex), 're'
+
+
+def backend_report(patterns):
+    """Group pattern names by the engine they were compiled with"""
+    report = {}
+    for name, pattern_info in patterns.items():
+        report.setdefault(pattern_info.get('engine', 're'), []).append(name)
+    return report
+
+
+class LazyPattern:
+    """
+    A pattern that is compiled on first use. The source is available as
+    .pattern right away; everything else is delegated to the compiled object.
+    """
+
+    __slots__ = ('pattern', 'backend', 'engine', '_compiled')
+
+    def __init__(self, regex, backend, engine=None, compiled=None):
+        self.pattern = regex
+        self.backend = backend
+        self.engine = engine
+        self._compiled = compiled
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled, self.engine = compile_pattern(self.pattern, self.backend)
+        return self._compiled
+
+    def __getattr__(self, name):
+        return getattr(self.compiled, name)
+
+    def __repr__(self):
+        state = 'compiled' if self._compiled is not None else 'lazy'
+        return f"LazyPattern({self.pattern!r}, {state})"
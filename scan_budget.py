@@ -0,0 +1,142 @@
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class PatternTimeout(Exception):
+    """Raised inside a regex call when its time slice runs out"""
+
+
+def _can_interrupt():
+    # sre checks for pending signals while matching, so SIGALRM can abort a
+    # runaway match; this only works on Unix and in the main thread
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+class BudgetedScan:
+    """Tracks the time spent by a single detect call"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.deadline = time.perf_counter() + budget.total_ms / 1000
+        self.incomplete = False
+        self.timed_out = []
+        self.skipped = []
+        self.interruptible = _can_interrupt()
+        self._armed = False
+        self._previous_handler = None
+
+    def _on_alarm(self, signum, frame):
+        # A late alarm that lands after the regex call returned is ignored
+        if self._armed:
+            raise PatternTimeout()
+
+    def __enter__(self):
+        if self.interruptible:
+            self._previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.interruptible:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+        return False
+
+    def expired(self):
+        return time.perf_counter() >= self.deadline
+
+    def run(self, name, call, quarantine=True):
+        """
+        Run one regex call within its time slice; returns its result, or None if skipped or aborted
+        quarantine: whether timeouts count towards quarantining name (off for the stage gates)
+        """
+        if name in self.budget.quarantined:
+            # A skipped pattern leaves the scan just as incomplete as an aborted one
+            self.incomplete = True
+            self.skipped.append(name)
+            self.budget.skipped[name] += 1
+            return None
+
+        start = time.perf_counter()
+        remaining = self.deadline - start
+        if remaining <= 0:
+            self.incomplete = True
+            return None
+        limit = min(self.budget.pattern_ms / 1000, remaining)
+
+        try:
+            if self.interruptible:
+                self._armed = True
+                signal.setitimer(signal.ITIMER_REAL, limit)
+            result = call()
+            self._armed = False
+        except PatternTimeout:
+            self.incomplete = True
+            self._strike(name, quarantine)
+            return None
+        finally:
+            self._armed = False
+            if self.interruptible:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+        # Without an interrupt the result is complete, but the slow pattern still counts
+        if time.perf_counter() - start > limit:
+            self._strike(name, quarantine)
+        return result
+
+    def _strike(self, name, quarantine):
+        self.timed_out.append(name)
+        if quarantine:
+            self.budget.record_timeout(name)
+
+
+class ScanBudget:
+    """Wall-clock budget per scan and per pattern, with quarantine for repeat offenders"""
+
+    def __init__(self, total_ms=50, pattern_ms=10, quarantine_after=3, on_timeout='block'):
+        if on_timeout not in ('block', 'allow'):
+            raise ValueError(f"on_timeout must be 'block' or 'allow', got {on_timeout!r}")
+        self.total_ms = total_ms
+        self.pattern_ms = pattern_ms
+        self.quarantine_after = quarantine_after
+        self.on_timeout = on_timeout
+
+        self.timeouts = Counter()
+        self.skipped = Counter()
+        self.quarantined = set()
+        self.incomplete_scans = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build a budget from the detection.scan_budget config section (None if disabled)"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(
+            total_ms=settings.get('total_ms', 50),
+            pattern_ms=settings.get('pattern_ms', 10),
+            quarantine_after=settings.get('quarantine_after', 3),
+            on_timeout=settings.get('on_timeout', 'block')
+        )
+
+    def start(self):
+        return BudgetedScan(self)
+
+    def record_timeout(self, name):
+        self.timeouts[name] += 1
+        if self.timeouts[name] >= self.quarantine_after and name not in self.quarantined:
+            self.quarantined.add(name)
+            print(f"[DETECTOR] ⚠️ Quarantined pattern '{name}' after {self.timeouts[name]} timeouts",
+                  file=sys.stderr)
+
+    def fail_closed(self):
+        return self.on_timeout == 'block'
+
+    def stats(self):
+        return {
+            'incomplete_scans': self.incomplete_scans,
+            'timeouts': dict(self.timeouts),
+            'quarantined': sorted(self.quarantined),
+            'skipped': dict(self.skipped)
+        }
@@ -0,0 +1,275 @@
+import hashlib
+import re
+from collections import Counter
+from prefilter import LiteralPrefilter
+from regex_backend import BACKENDS, LazyPattern
+from token_validators import valid_matches
+from match_record import Match, pattern_metadata
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Stages are scanned in this order; unknown severities get their own stage last
+SEVERITY_ORDER = ('critical', 'high', 'medium', 'low')
+
+
+def leading_literal(regex):
+    """Return the case-sensitive literal every match of regex starts with ('' if none)"""
+    try:
+        parsed = sre_parse.parse(regex)
+    except re.error:
+        return ''
+    if parsed.state.flags & re.IGNORECASE:
+        return ''
+    chars = []
+    for op, av in parsed.data:
+        if op is not sre_parse.LITERAL:
+            break
+        chars.append(chr(av))
+    return ''.join(chars)
+
+
+def max_match_width(regex):
+    """Return the longest match regex can produce, or None if it is unbounded"""
+    try:
+        width = sre_parse.parse(regex).getwidth()[1]
+    except re.error:
+        return None
+    return None if width >= sre_parse.MAXREPEAT else width
+
+
+def is_combinable(regex, literal=None):
+    """Check whether a pattern can be safely embedded in a combined alternation"""
+    # Numbered backreferences would point at the wrong group once combined
+    if re.search(r'\\[1-9]|\(\?P=', regex):
+        return False
+    return bool(leading_literal(regex) if literal is None else literal)
+
+
+def _compiled(pattern_info):
+    """The compiled regex behind a pattern, without going through LazyPattern's attribute proxy"""
+    regex = pattern_info['regex']
+    return regex.compiled if isinstance(regex, LazyPattern) else regex
+
+
+def _finditer(session, name, regex, text, pos):
+    if session is None:
+        return regex.finditer(text, pos)
+    return session.run(name, lambda: list(regex.finditer(text, pos))) or []
+
+
+def _matches(session, name, pattern_info, text, pos):
+    """Matches of one pattern from pos on that pass its structural validator"""
+    regex = _compiled(pattern_info)
+    return valid_matches(pattern_info, text, pos, lambda p: _finditer(session, name, regex, text, p))
+
+
+class ScanStage:
+    """All patterns of one severity, gated by a single combined alternation"""
+
+    def __init__(self, severity, patterns, backend):
+        self.severity = severity
+        self.gated = []     # (name, pattern_info, leading literal)
+        self.residual = []  # (name, pattern_info)
+        self.combined = None
+
+        alternatives = []
+        for name, pattern_info in patterns:
+            regex = pattern_info['regex'].pattern
+            # Config snapshots carry the literal, which saves parsing the regex again
+            literal = pattern_info.get('leading_literal')
+            if literal is None:
+                literal = leading_literal(regex)
+            if is_combinable(regex, literal):
+                # The marker group comes last so each branch still starts with
+                # its literal, which keeps sre's fast branch rejection working
+                alternatives.append(f"(?:{regex})(?P<_p{len(self.gated)}>)")
+                self.gated.append((name, pattern_info, literal))
+            else:
+                self.residual.append((name, pattern_info))
+
+        if alternatives:
+            # Compiled on the first scan that needs it, not at startup
+            self.combined = LazyPattern('|'.join(alternatives), backend)
+        self._index()
+
+    def _index(self):
+        # Scans intersect the prefilter's candidates with these instead of walking every pattern
+        self.gated_names = frozenset(n for n, _, _ in self.gated)
+        self.residual_by_name = dict(self.residual)
+
+    def names(self):
+        return [n for n, _, _ in self.gated] + [n for n, _ in self.residual]
+
+    def warm(self):
+        """Compile the combined gate now (demoting its patterns if it fails to compile)"""
+        if self.gated:
+            self._gate_start('', None)
+
+    def _gate_start(self, text, session):
+        """Return where the first gated pattern could match, or None if none can"""
+        try:
+            combined = self.combined.compiled
+        except re.error:
+            # Scan the gated patterns one by one from now on
+            self.residual = [(n, p) for n, p, _ in self.gated] + self.residual
+            self.gated = []
+            self._index()
+            return 0
+
+        if session is None:
+            first = combined.search(text)
+        else:
+            incomplete = session.incomplete
+            # The gate only narrows the search, so a slow one is never quarantined
+            outcome = session.run(f"<{self.severity} gate>", lambda: [combined.search(text)], quarantine=False)
+            if outcome is None:
+                # An aborted gate proves nothing, so every gated pattern gets checked
+                # (each one then counts against the budget on its own)
+                session.incomplete = incomplete
+                return 0
+            first = outcome[0]
+        return None if first is None else first.start()
+
+    def scan(self, text, candidates, session=None):
+        """Return (name, pattern_info, match) for every validated hit among the candidate patterns"""
+        hits = []
+        if not candidates.isdisjoint(self.gated_names):
+            start = self._gate_start(text, session)
+            if start is not None:
+                # No gated pattern can match before the first combined hit, and
+                # one whose literal is absent past that point cannot match at all
+                for name, pattern_info, literal in self.gated:
+                    if name not in candidates or text.find(literal, start) == -1:
+                        continue
+                    for match in _matches(session, name, pattern_info, text, start):
+                        hits.append((name, pattern_info, match))
+
+        # Hit order across patterns doesn't matter: the engine sorts by config order
+        for name in candidates.intersection(self.residual_by_name):
+            pattern_info = self.residual_by_name[name]
+            for match in _matches(session, name, pattern_info, text, 0):
+                hits.append((name, pattern_info, match))
+        return hits
+
+
+def pattern_set_version(patterns, backend_name='re'):
+    """Fingerprint of a compiled pattern set; changes whenever any pattern does"""
+    digest = hashlib.sha256(backend_name.encode())
+    for name, pattern_info in patterns.items():
+        validator = pattern_info.get('validator')
+        for part in (name, pattern_info['regex'].pattern, pattern_info['severity'],
+                     pattern_info['description'], validator.__name__ if validator else ''):
+            digest.update(part.encode('utf-8', 'surrogatepass') + b'\0')
+    return digest.hexdigest()[:16]
+
+
+class ScanEngine:
+    """Scans text against the full pattern set in severity-ordered stages"""
+
+    def __init__(self, patterns, backend=None):
+        self.patterns = patterns
+        self.backend = backend or BACKENDS['re']
+        self.version = pattern_set_version(patterns, self.backend.name)
+        self.order = {name: i for i, name in enumerate(patterns)}
+        self.metadata = {
+            name: pattern_metadata(name, info['description'], info['severity'])
+            for name, info in patterns.items()
+        }
+
+        by_severity = {}
+        for name, pattern_info in patterns.items():
+            by_severity.setdefault(pattern_info['severity'], []).append((name, pattern_info))
+
+        severities = [s for s in SEVERITY_ORDER if s in by_severity]
+        severities += [s for s in by_severity if s not in SEVERITY_ORDER]
+        self.stages = [ScanStage(s, by_severity[s], self.backend) for s in severities]
+        self.prefilter = LiteralPrefilter(patterns)
+
+        widths = [p['max_width'] if 'max_width' in p else max_match_width(p['regex'].pattern)
+                  for p in patterns.values()]
+        self.max_width = max((w for w in widths if w is not None), default=0)
+        self.unbounded = any(w is None for w in widths)
+
+        # Observed hit rates steer the evaluation order of first_hit
+        self.evaluations = Counter()
+        self.hits = Counter()
+        self._first_hit_order = self._rank_for_first_hit()
+        self._calls_since_rank = 0
+
+    def _rank_for_first_hit(self):
+        """Critical patterns first, then everything by observed hit rate (highest first)"""
+        def hit_rate(name):
+            # Smoothed so unseen patterns keep their config order behind proven ones
+            return (self.hits[name] + 1) / (self.evaluations[name] + 2)
+
+        return sorted(
+            self.patterns,
+            key=lambda name: (self.patterns[name]['severity'] != 'critical', -hit_rate(name), self.order[name])
+        )
+
+    def scan(self, text, session=None):
+        """
+        Scan text with every pattern
+        Returns: Match records for the same hits, in the same order, as a per-pattern finditer loop
+        """
+        candidates = self.prefilter.candidates(text)
+        hits = []
+        for stage in self.stages:
+            # Structural validators have already rejected look-alikes
+            for name, pattern_info, match in stage.scan(text, candidates, session):
+                hits.append((self.order[name], Match(self.metadata[name], text, *match.span())))
+
+        # Per-pattern hits are already position-ordered; a stable sort restores config order
+        hits.sort(key=lambda hit: hit[0])
+        return [hit for _, hit in hits]
+
+    def overlap(self, cap):
+        """Window overlap needed for streaming scans: the longest match, capped for unbounded patterns"""
+        return cap if self.unbounded else min(self.max_width, cap)
+
+    def first_hit(self, text, accept=None, session=None):
+        """
+        Find one confirmed secret without enumerating the rest
+        accept: optional predicate on a Match; rejected hits don't stop the search
+        Returns: the first accepted Match, or None
+        """
+        self._calls_since_rank += 1
+        if self._calls_since_rank >= 256:
+            self._first_hit_order = self._rank_for_first_hit()
+            self._calls_since_rank = 0
+
+        candidates = self.prefilter.candidates(text)
+        for name in self._first_hit_order:
+            if name not in candidates:
+                continue
+            pattern_info = self.patterns[name]
+            self.evaluations[name] += 1
+            for match in _matches(session, name, pattern_info, text, 0):
+                hit = Match(self.metadata[name], text, *match.span())
+                if accept is None or accept(hit):
+                    self.hits[name] += 1
+                    return hit
+        return None
+
+    def warm(self):
+        """Compile every lazily compiled pattern, so no scan pays for compilation"""
+        for pattern_info in self.patterns.values():
+            getattr(pattern_info['regex'], 'compiled', None)
+        for stage in self.stages:
+            stage.warm()
+        if self.prefilter.regex is not None:
+            self.prefilter.regex.compiled
+
+    def stats(self):
+        """Summarize how the pattern set was split across stages"""
+        return {
+            stage.severity: {
+                'combined': len(stage.gated),
+                'individual': len(stage.residual),
+                'unanchored': len([n for n in stage.names() if n in self.prefilter.always])
+            }
+            for stage in self.stages
+        }
@@ -1,5 +1,32 @@
-import re
+import codecs
+import os
+import threading
+import time
 from config_manager import ConfigManager
+from config_watcher import ConfigWatcher
+from detector_snapshot import DetectorSnapshot
+from detection_cache import DetectionCache
+from redaction import redact
+from match_record import DetectionResult
+
+# Per-process detector used by detect_many workers
+_worker_detector = None
+
+
+def _init_worker(config_file):
+    """Compile the pattern set once per worker process and warm it up"""
+    global _worker_detector
+    _worker_detector = SecretDetector(ConfigManager(config_file))
+    # A warmup detect() only compiles the patterns its prefilter selects
+    _worker_detector._snapshot.warm()
+    _worker_detector.detect("warmup AKIA")
+
+
+def _detect_timed(text):
+    start = time.perf_counter()
+    secrets = _worker_detector.detect(text)
+    return {'secrets': secrets, 'latency_ms': round((time.perf_counter() - start) * 1000, 4)}
+
 
 class SecretDetector:
     """Detects secrets and sensitive information in commands"""
@@ -8,44 +35,272 @@ class SecretDetector:
         if config_manager is None:
             config_manager = ConfigManager()
         
-        self.config_manager = config_manager
-        self.patterns = self.config_manager.get_patterns()
+        # Scans read only the current snapshot; a reload builds a new one and
+        # publishes it with a single assignment, so scans never take a lock
+        self._snapshot = DetectorSnapshot(config_manager)
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        # Entries are keyed by the pattern set version, so reloads never serve stale results
+        self.cache = DetectionCache.from_settings(config_manager.get_cache_settings())
+        self._pool = None
+        self._pool_workers = None
+    
+    # Read-only views of the current snapshot
+    config_manager = property(lambda self: self._snapshot.config_manager)
+    patterns = property(lambda self: self._snapshot.patterns)
+    engine = property(lambda self: self._snapshot.engine)
+    entropy = property(lambda self: self._snapshot.entropy)
+    decoder = property(lambda self: self._snapshot.decoder)
+    scan_budget = property(lambda self: self._snapshot.scan_budget)
+    version = property(lambda self: self._snapshot.version)
+    two_phase = property(lambda self: self._snapshot.gate is not None)
+    blocking_severities = property(lambda self: self._snapshot.blocking)
+    
+    def get_backend_report(self):
+        """List which patterns were compiled by which regex engine"""
+        return self._snapshot.backend_report()
     
     def reload_patterns(self):
-        """Reload patterns from config file"""
+        """
+        Reload patterns from config file. The new snapshot is built and warmed
+        up off to the side; scans keep using the old one until it is swapped in.
+        Returns: whether the new config was applied (a broken one is rejected)
+        """
         import sys
-        self.config_manager.reload_config()
-        self.patterns = self.config_manager.get_patterns()
-        print(f"[DETECTOR] Reloaded {len(self.patterns)} detection patterns", file=sys.stderr)
+        with self._reload_lock:
+            shared = self._snapshot.config_manager
+            try:
+                # Validated in a fresh manager, so a broken config leaves the shared one untouched
+                fresh = ConfigManager(shared.config_file)
+                snapshot = DetectorSnapshot(fresh)
+                snapshot.warm()
+            except Exception as e:
+                print(f"[DETECTOR] ❌ Reload failed, keeping the current patterns: {e}", file=sys.stderr)
+                return False
+            # Callers holding the shared manager (the middleware, the interceptor)
+            # now read the same config as the snapshot being published
+            shared.adopt(fresh)
+            snapshot.config_manager = shared
+            self._snapshot = snapshot
+        # Workers hold the old pattern set; the next batch starts fresh ones
+        self.close()
+        print(f"[DETECTOR] Reloaded {len(snapshot.patterns)} detection patterns", file=sys.stderr)
+        for engine, names in snapshot.backend_report().items():
+            print(f"[DETECTOR]   {engine}: {len(names)} patterns", file=sys.stderr)
+        return True
+    
+    def start_watching(self):
+        """Reload automatically when the config file changes, if hot_reload is enabled"""
+        settings = self.config_manager.get_hot_reload_settings()
+        if not settings.get('enabled', False) or self._watcher is not None:
+            return self._watcher
+        self._watcher = ConfigWatcher(
+            self.config_manager.config_file,
+            self.reload_patterns,
+            interval=settings.get('poll_interval_s', 1.0),
+            settle=settings.get('settle_s', 0.2)
+        ).start()
+        return self._watcher
+    
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
     
     def detect(self, command):
         """
         Scan a command for secrets
-        Returns: list of detected secrets with their types
+        Returns: DetectionResult of Match records (types and severities precomputed)
         """
+        snap = self._snapshot
+        
         # Check if detection is enabled
-        if not self.config_manager.is_detection_enabled():
-            return []
+        if not snap.enabled:
+            return DetectionResult()
         
         # Check if command is whitelisted
-        if self.config_manager.is_whitelisted(command):
-            return []
+        if snap.is_whitelisted(command):
+            return DetectionResult()
+        
+        if self.cache is None:
+            return DetectionResult(snap.scan(command)[0])
+        
+        key = self.cache.key(command, snap.version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return DetectionResult(snap.expand(command, cached))
+        
+        detected, complete = snap.scan(command)
+        if complete:
+            self.cache.put(key, detected)
+        return DetectionResult(detected)
+    
+    def detect_first(self, command, accept=None, blocking_only=False):
+        """
+        Find the first secret worth blocking on, without enumerating every match.
+        Critical patterns run first, then the rest by observed hit rate.
+        accept: optional predicate to skip hits the caller treats as false positives
+        blocking_only: with two-phase scanning enabled, only consider the
+        blocking severities (the request-path gate); ignored otherwise
+        Returns: a detected Match, or None
+        """
+        return self.check_first(command, accept, blocking_only)[0]
+    
+    def check_first(self, command, accept=None, blocking_only=False):
+        """
+        detect_first, also reporting whether the scan ran within its budget
+        Returns: (Match or None, False if a pattern timed out or was skipped)
+        """
+        snap = self._snapshot
+        if not snap.enabled:
+            return None, True
         
-        detected = []
+        if snap.is_whitelisted(command):
+            return None, True
         
-        for secret_type, pattern_info in self.patterns.items():
-            matches = pattern_info['regex'].finditer(command)
-            for match in matches:
-                detected.append({
-                    'type': secret_type,
-                    'match': match.group(0),
-                    'position': match.span(),
-                    'description': pattern_info['description'],
-                    'severity': pattern_info['severity']
-                })
+        blocking_only = blocking_only and snap.gate is not None
+        if blocking_only:
+            accept = snap.blocking_accept(accept)
         
-        return detected
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(command, snap.version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                for secret in snap.expand(command, cached):
+                    if accept is None or accept(secret):
+                        return secret, True
+                return None, True
+        
+        secret, complete = snap.first_hit(command, accept, blocking_only)
+        
+        # A full miss with no filter is the same as an empty full scan
+        if key is not None and secret is None and accept is None and complete:
+            self.cache.put(key, [])
+        return secret, complete
+    
+    def get_cache_stats(self):
+        """Get hit/miss counters of the detection cache"""
+        return self.cache.stats() if self.cache else {'enabled': False}
+    
+    def get_decode_stats(self):
+        """Get byte counters of the decoding pre-pass"""
+        return self.decoder.stats() if self.decoder else {'enabled': False}
+    
+    def detect_many(self, texts, workers=None, chunksize=None):
+        """
+        Scan a batch of inputs across a pool of worker processes
+        Returns: one {'secrets': [...], 'latency_ms': float} per input, in input order
+        """
+        texts = list(texts)
+        workers = workers or os.cpu_count() or 1
+        
+        # Not worth the pool round-trips for tiny batches or a single worker
+        if workers == 1 or len(texts) < 2 * workers:
+            results = []
+            for text in texts:
+                start = time.perf_counter()
+                secrets = self.detect(text)
+                results.append({'secrets': secrets, 'latency_ms': round((time.perf_counter() - start) * 1000, 4)})
+            return results
+        
+        pool = self._get_pool(workers)
+        chunksize = chunksize or max(1, len(texts) // (workers * 4))
+        return list(pool.map(_detect_timed, texts, chunksize=chunksize))
+    
+    def _get_pool(self, workers):
+        # Imported here so processes that never batch don't pay for it at startup
+        from concurrent.futures import ProcessPoolExecutor
+        if self._pool is None or self._pool_workers != workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.config_manager.config_file,)
+            )
+            self._pool_workers = workers
+        return self._pool
+    
+    def close(self):
+        """Shut down the detect_many worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_workers = None
+    
+    def scan_stream(self, chunks, chunk_size=None):
+        """
+        Scan an unbounded input given as an iterable of str (or UTF-8 bytes) chunks.
+        Text is scanned in windows that overlap by the longest possible match, so
+        memory stays at about chunk_size + 2 * overlap characters.
+        Yields: detected secret dicts with absolute positions, in stream order
+        """
+        # The whole stream is scanned with the snapshot current when it started
+        snap = self._snapshot
+        if not snap.enabled:
+            return
+        
+        settings = snap.stream_settings
+        overlap = snap.engine.overlap(settings.get('max_overlap', 4096))
+        if snap.entropy is not None:
+            overlap = max(overlap, snap.entropy.max_length)
+        chunk_size = max(chunk_size or settings.get('chunk_size', 65536), 2 * overlap, 1)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        # buffer starts at absolute offset base and the next window at buffer[pos];
+        # hits starting before owned_from sit in the left context and were
+        # already reported by the previous window
+        buffer = ''
+        base = 0
+        pos = 0
+        owned_from = 0
+        last_end = {}
+        
+        def emit(window, offset, final):
+            owned_to = len(window) if final else len(window) - overlap
+            detected, _ = snap.scan(window)
+            detected.sort(key=lambda d: d['position'])
+            for secret in detected:
+                start, end = secret['position']
+                if not owned_from <= start < owned_to and secret['type'] != 'scan_timeout':
+                    continue
+                start, end = start + offset, end + offset
+                # An unbounded match cut at a window edge reappears as a tail in the next one
+                if start < last_end.get(secret['type'], 0):
+                    continue
+                last_end[secret['type']] = end
+                yield dict(secret, position=(start, end))
+            return owned_to
+        
+        for chunk in chunks:
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk)
+            buffer += chunk
+            while len(buffer) - pos >= chunk_size + overlap:
+                window = buffer[pos:pos + chunk_size + overlap]
+                owned_to = yield from emit(window, base + pos, final=False)
+                # Keep one overlap of left context ahead of the next owned region
+                pos += owned_to - overlap
+                owned_from = overlap
+            # Drop the scanned text once per chunk, not once per window
+            buffer = buffer[pos:]
+            base += pos
+            pos = 0
+        
+        buffer += decoder.decode(b'', final=True)
+        if buffer:
+            yield from emit(buffer, base, final=True)
+    
+    def redact(self, command, detected=None):
+        """
+        Mask the secrets in a command, merging overlapping hits
+        detected: findings to mask (default: a fresh detect of the command)
+        Returns: (masked command, consolidated findings)
+        """
+        if detected is None:
+            detected = self.detect(command)
+        return redact(command, detected)
     
     def has_secrets(self, command):
         """Check if command contains any secrets"""
-        return len(self.detect(command)) > 0
+        return self.detect_first(command) is not None
@@ -0,0 +1,211 @@
+import base64
+import binascii
+import hashlib
+import json
+import sys
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_INDEX = {c: i for i, c in enumerate(BASE58_ALPHABET)}
+BECH32_ALPHABET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+BECH32_INDEX = {c: i for i, c in enumerate(BECH32_ALPHABET)}
+# AWS key IDs are base32 after the 4-character prefix
+AWS_KEY_ID_ALPHABET = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ234567')
+HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+ALNUM = frozenset('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+# Backslash escapes whose letter stands for a control character (JSON, shell, C)
+CONTROL_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+
+
+def _escaped(text, index):
+    """Check whether text[index] follows an odd run of backslashes, i.e. is part of an escape"""
+    run = 0
+    while index - run > 0 and text[index - run - 1] == '\\':
+        run += 1
+    return run % 2 == 1
+
+
+def _char_before(text, start):
+    """
+    The character that ends right before start, with a backslash escape decoded:
+    the middleware scans json.dumps output, where a newline before a key is the
+    two characters \\n and must not make the key look embedded in a word
+    """
+    char = text[start - 1]
+    hex_digits = text[start - 4:start]
+    if (start >= 6 and text[start - 5] == 'u' and _escaped(text, start - 5)
+            and all(c in HEX_DIGITS for c in hex_digits)):
+        return chr(int(hex_digits, 16))
+    if char in CONTROL_ESCAPES and _escaped(text, start - 1):
+        return CONTROL_ESCAPES[char]
+    return char
+
+
+def escape_end(text, index):
+    """If text[index] lies inside a backslash escape, return the index just past the escape, else None"""
+    if _escaped(text, index):
+        return index + 5 if text[index] == 'u' else index + 1
+    for back in range(1, 5):
+        u = index - back
+        if (u > 0 and text[u] == 'u' and _escaped(text, u) and len(text) >= u + 5
+                and all(c in HEX_DIGITS for c in text[u + 1:u + 5])):
+            return u + 5
+    return None
+
+
+def _embedded(text, start, end, alphabet):
+    """Check whether the span is only a slice of a longer run of alphabet characters"""
+    return (start > 0 and _char_before(text, start) in alphabet) or (end < len(text) and text[end] in alphabet)
+
+
+def luhn(text, start, end):
+    """Card numbers: 13-19 digits (dashes and spaces ignored) with a valid Luhn checksum"""
+    digits = [int(c) for c in text[start:end] if c.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def _b58decode(token):
+    value = 0
+    for char in token:
+        index = BASE58_INDEX.get(char)
+        if index is None:
+            return None
+        value = value * 58 + index
+    body = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    # Leading '1's encode leading zero bytes
+    return b'\0' * (len(token) - len(token.lstrip('1'))) + body
+
+
+def base58check(text, start, end):
+    """Base58Check payloads (legacy BTC addresses, WIF keys): the double-SHA256 checksum must match"""
+    raw = _b58decode(text[start:end])
+    if raw is None or len(raw) < 5:
+        return False
+    payload, checksum = raw[:-4], raw[-4:]
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] == checksum
+
+
+def _bech32_polymod(values):
+    generator = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                checksum ^= generator[i]
+    return checksum
+
+
+def bech32(text, start, end):
+    """Bech32/Bech32m strings (segwit addresses): the BCH checksum must match"""
+    token = text[start:end]
+    if token.lower() != token and token.upper() != token:
+        return False
+    hrp, sep, data = token.lower().rpartition('1')
+    if not sep or not hrp or len(data) < 6:
+        return False
+    try:
+        values = [BECH32_INDEX[c] for c in data]
+    except KeyError:
+        return False
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    # 1 for Bech32 (segwit v0), 0x2bc830a3 for Bech32m (taproot)
+    return _bech32_polymod(expanded + values) in (1, 0x2bc830a3)
+
+
+def bitcoin_address(text, start, end):
+    """Bitcoin addresses: bech32 for bc1 addresses, Base58Check for legacy ones"""
+    if text[start:end].lower().startswith('bc1'):
+        return bech32(text, start, end)
+    return base58check(text, start, end)
+
+
+def aws_key_id(text, start, end):
+    """AWS access key IDs: exactly 20 characters, base32 after the prefix, not part of a longer token"""
+    token = text[start:end]
+    if len(token) != 20 or _embedded(text, start, end, ALNUM):
+        return False
+    return all(c in AWS_KEY_ID_ALPHABET for c in token[4:])
+
+
+def jwt(text, start, end):
+    """JWTs: the first segment must decode to a JSON object naming an algorithm"""
+    header = text[start:end].split('.', 1)[0]
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4)))
+    except (binascii.Error, ValueError):
+        return False
+    return isinstance(decoded, dict) and 'alg' in decoded
+
+
+def hex_token(text, start, end):
+    """Fixed-length hex keys: not all digits and not a slice of a longer hash"""
+    token = text[start:end]
+    if token[:2] in ('0x', '0X'):
+        token = token[2:]
+    if token.isdigit():
+        return False
+    return not _embedded(text, start, end, HEX_DIGITS)
+
+
+VALIDATORS = {
+    'luhn': luhn,
+    'base58check': base58check,
+    'bech32': bech32,
+    'bitcoin_address': bitcoin_address,
+    'aws_key_id': aws_key_id,
+    'jwt': jwt,
+    'hex_token': hex_token,
+}
+
+
+def get_validator(name):
+    """Resolve a pattern's configured validator name (None if not set or unknown)"""
+    if not name:
+        return None
+    validator = VALIDATORS.get(name)
+    if validator is None:
+        print(f"[CONFIG] Unknown validator '{name}', ignoring it", file=sys.stderr)
+    return validator
+
+
+def is_valid(pattern_info, text, start, end):
+    """Run the pattern's validator on a candidate span (always valid without one)"""
+    validator = pattern_info.get('validator')
+    return validator is None or validator(text, start, end)
+
+
+def valid_matches(pattern_info, text, pos, finditer):
+    """
+    The matches of finditer(pos) that pass the pattern's validator.
+    A rejected match that starts inside a backslash escape (the b of \\b, the
+    digits of \\u00e9) can hide a real token right after the escape, since
+    finditer doesn't revisit overlapping positions; the search resumes there.
+    """
+    validator = pattern_info.get('validator')
+    if validator is None:
+        return finditer(pos)
+    return _validated(validator, text, pos, finditer)
+
+
+def _validated(validator, text, pos, finditer):
+    while pos is not None:
+        resume = None
+        for match in finditer(pos):
+            start, end = match.span()
+            if validator(text, start, end):
+                yield match
+            else:
+                resume = escape_end(text, start)
+                if resume is not None:
+                    break
+        pos = resume
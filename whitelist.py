@@ -0,0 +1,79 @@
+import fnmatch
+import re
+
+GLOB_CHARS = '*?['
+
+
+class GlobTrie:
+    """Prefix trie of glob entries keyed by the literal text before their first wildcard"""
+
+    def __init__(self, globs=()):
+        self.root = {}
+        for glob in globs:
+            self.add(glob)
+
+    def add(self, glob):
+        cut = min((glob.index(c) for c in GLOB_CHARS if c in glob), default=len(glob))
+        node = self.root
+        for char in glob[:cut]:
+            node = node.setdefault(char, {})
+        node.setdefault('', []).append(re.compile(fnmatch.translate(glob)))
+
+    def matches(self, text):
+        """Check text against only the globs whose literal prefix it starts with"""
+        node = self.root
+        for char in text:
+            for glob in node.get('', ()):
+                if glob.match(text):
+                    return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return any(glob.match(text) for glob in node.get('', ()))
+
+
+class WhitelistMatcher:
+    """Whitelist compiled once per config load"""
+
+    def __init__(self, whitelist):
+        self.commands = set()
+        self.globs = GlobTrie()
+        for command in whitelist.get('commands', []):
+            if any(c in command for c in GLOB_CHARS):
+                self.globs.add(command)
+            else:
+                self.commands.add(command)
+
+        patterns = whitelist.get('patterns', [])
+        # Patterns anchored with ^ only need to be tried at the start of the command
+        anchored = [p for p in patterns if p.startswith('^') and '|' not in p]
+        floating = [p for p in patterns if p not in anchored]
+        self.anchored = self._merge(anchored)
+        self.floating = self._merge(floating)
+
+    @staticmethod
+    def _merge(patterns):
+        """Merge patterns into one alternation, keeping them separate if they can't be combined"""
+        if not patterns:
+            return []
+        try:
+            return [re.compile('|'.join(f'(?:{p})' for p in patterns))]
+        except re.error:
+            return [re.compile(p) for p in patterns]
+
+    def matches(self, command):
+        """Check if a command is whitelisted"""
+        command = command.strip()
+
+        # Check exact command matches
+        if command in self.commands:
+            return True
+
+        # Check glob command matches
+        if self.globs.matches(command):
+            return True
+
+        # Check pattern matches
+        if any(pattern.match(command) for pattern in self.anchored):
+            return True
+        return any(pattern.search(command) for pattern in self.floating)